@@ -0,0 +1,73 @@
+"""add search vectors
+
+Revision ID: 1b9d7f3a26e4
+Revises: 0a8c6e2f15d3
+Create Date: 2025-06-15 09:37:52.106834
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "1b9d7f3a26e4"
+down_revision: Union[str, None] = "0a8c6e2f15d3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Stored generated columns; adding them rewrites both tables once
+    op.add_column(
+        "thread",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+                "setweight(to_tsvector('english', coalesce(summary, '')), 'B') || "
+                "setweight(to_tsvector('english', coalesce(content, '')), 'C')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.add_column(
+        "comment",
+        sa.Column(
+            "search_vector",
+            postgresql.TSVECTOR(),
+            sa.Computed(
+                "setweight(to_tsvector('english', coalesce(content, '')), 'C')",
+                persisted=True,
+            ),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_thread_search_vector",
+        "thread",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+    op.create_index(
+        "ix_comment_search_vector",
+        "comment",
+        ["search_vector"],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_comment_search_vector", table_name="comment")
+    op.drop_index("ix_thread_search_vector", table_name="thread")
+    op.drop_column("comment", "search_vector")
+    op.drop_column("thread", "search_vector")
@@ -0,0 +1,76 @@
+"""migrate tags to jsonb and add tag count
+
+Revision ID: 2c0e8a4b37f5
+Revises: 1b9d7f3a26e4
+Create Date: 2025-06-15 14:05:36.772410
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = "2c0e8a4b37f5"
+down_revision: Union[str, None] = "1b9d7f3a26e4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        "thread",
+        "tags",
+        type_=postgresql.JSONB(),
+        existing_type=sa.JSON(),
+        postgresql_using="tags::jsonb",
+    )
+    op.create_index(
+        "ix_thread_tags", "thread", ["tags"], unique=False, postgresql_using="gin"
+    )
+    op.create_index(
+        "ix_thread_category_created_at",
+        "thread",
+        ["category", "created_at", "id"],
+        unique=False,
+    )
+    op.create_table(
+        "tagcount",
+        sa.Column("tag", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("tag"),
+    )
+    op.create_index(op.f("ix_tagcount_count"), "tagcount", ["count"], unique=False)
+    # Backfill the aggregate from existing threads
+    op.execute(
+        """
+        INSERT INTO tagcount (tag, count)
+        SELECT tag, COUNT(DISTINCT thread.id)
+        FROM thread,
+            jsonb_array_elements_text(
+                CASE WHEN jsonb_typeof(thread.tags) = 'array'
+                THEN thread.tags ELSE '[]'::jsonb END
+            ) AS tag
+        GROUP BY tag
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_tagcount_count"), table_name="tagcount")
+    op.drop_table("tagcount")
+    op.drop_index("ix_thread_category_created_at", table_name="thread")
+    op.drop_index("ix_thread_tags", table_name="thread")
+    op.alter_column(
+        "thread",
+        "tags",
+        type_=sa.JSON(),
+        existing_type=postgresql.JSONB(),
+        postgresql_using="tags::json",
+    )
@@ -0,0 +1,102 @@
+"""add lookup indexes
+
+Revision ID: 3d1f9b5c48a6
+Revises: 2c0e8a4b37f5
+Create Date: 2025-06-16 09:22:51.408137
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3d1f9b5c48a6"
+down_revision: Union[str, None] = "2c0e8a4b37f5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = (
+    ("ix_thread_created_at", "thread", ["created_at", "id"]),
+    ("ix_comment_thread_id_created_at", "comment", ["thread_id", "created_at", "id"]),
+    (
+        "ix_comment_parent_comment_id_created_at",
+        "comment",
+        ["parent_comment_id", "created_at", "id"],
+    ),
+    ("ix_vote_user_id", "vote", ["user_id"]),
+    ("ix_vote_thread_id", "vote", ["thread_id"]),
+    ("ix_vote_comment_id", "vote", ["comment_id"]),
+    ("ix_attachment_thread_id", "attachment", ["thread_id"]),
+    ("ix_attachment_file_url", "attachment", ["file_url"]),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+    # Keep the newest of any duplicate votes so the unique indexes can be built
+    for fk in ("thread_id", "comment_id"):
+        op.execute(
+            f"""
+            DELETE FROM vote
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, row_number() OVER (
+                        PARTITION BY user_id, {fk} ORDER BY id DESC
+                    ) AS rn
+                    FROM vote
+                    WHERE {fk} IS NOT NULL
+                ) AS ranked
+                WHERE rn > 1
+            )
+            """
+        )
+    op.create_index(
+        "uq_vote_user_thread",
+        "vote",
+        ["user_id", "thread_id"],
+        unique=True,
+        postgresql_where=sa.text("thread_id IS NOT NULL"),
+    )
+    op.create_index(
+        "uq_vote_user_comment",
+        "vote",
+        ["user_id", "comment_id"],
+        unique=True,
+        postgresql_where=sa.text("comment_id IS NOT NULL"),
+    )
+
+    # Recount the counters in case duplicates were removed
+    for table, fk in (("thread", "thread_id"), ("comment", "comment_id")):
+        op.execute(
+            f"""
+            UPDATE "{table}" AS t
+            SET score = v.score, upvotes = v.upvotes, downvotes = v.downvotes
+            FROM (
+                SELECT {fk} AS target_id,
+                       COALESCE(SUM(value), 0) AS score,
+                       COUNT(*) FILTER (WHERE value = 1) AS upvotes,
+                       COUNT(*) FILTER (WHERE value = -1) AS downvotes
+                FROM vote
+                WHERE {fk} IS NOT NULL
+                GROUP BY {fk}
+            ) AS v
+            WHERE t.id = v.target_id
+              AND (t.score, t.upvotes, t.downvotes)
+                  IS DISTINCT FROM (v.score, v.upvotes, v.downvotes)
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("uq_vote_user_comment", table_name="vote")
+    op.drop_index("uq_vote_user_thread", table_name="vote")
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,55 @@
+"""add vote counters to thread and comment
+
+Revision ID: a3f9c1d27b64
+Revises: 5c64f01d832b
+Create Date: 2025-06-10 09:12:44.105237
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3f9c1d27b64"
+down_revision: Union[str, None] = "5c64f01d832b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ("thread", "comment"):
+        for column in ("score", "upvotes", "downvotes"):
+            op.add_column(
+                table,
+                sa.Column(column, sa.Integer(), nullable=False, server_default="0"),
+            )
+
+    # Backfill counters from the existing votes
+    for table, fk in (("thread", "thread_id"), ("comment", "comment_id")):
+        op.execute(
+            f"""
+            UPDATE "{table}" AS t
+            SET score = v.score, upvotes = v.upvotes, downvotes = v.downvotes
+            FROM (
+                SELECT {fk} AS target_id,
+                       COALESCE(SUM(value), 0) AS score,
+                       COUNT(*) FILTER (WHERE value = 1) AS upvotes,
+                       COUNT(*) FILTER (WHERE value = -1) AS downvotes
+                FROM vote
+                WHERE {fk} IS NOT NULL
+                GROUP BY {fk}
+            ) AS v
+            WHERE t.id = v.target_id
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ("comment", "thread"):
+        for column in ("downvotes", "upvotes", "score"):
+            op.drop_column(table, column)
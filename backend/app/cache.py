@@ -0,0 +1,62 @@
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+
+
+class TTLCache:
+    """
+    In-process LRU cache whose entries also expire `ttl` seconds after being
+    stored. Keeps hit/miss counters for monitoring. `on_remove(key, value)`
+    is called whenever an entry leaves the cache other than through `get`'s
+    return value: expired, evicted, replaced, invalidated or cleared.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        on_remove: Callable[[object, object], None] | None = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_remove = on_remove
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value):
+        self._remove(key)
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        while len(self._data) > self.maxsize:
+            self._remove(next(iter(self._data)))
+
+    def invalidate(self, key):
+        self._remove(key)
+
+    def clear(self):
+        for key in list(self._data):
+            self._remove(key)
+
+    def _remove(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None and self.on_remove is not None:
+            self.on_remove(key, entry[1])
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,48 @@
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+# Content-addressed URLs never change what they point to
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Anything else may be cached, but must be revalidated before reuse
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def is_not_modified(
+    request: Request, etag: str | None, last_modified: float | None
+) -> bool:
+    """
+    Whether the client's cached copy is still fresh. If-None-Match takes
+    precedence over If-Modified-Since, as RFC 9110 requires.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag is not None and etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
+
+def not_modified(headers: dict[str, str]) -> Response:
+    return Response(status_code=304, headers=headers)
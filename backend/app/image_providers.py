@@ -0,0 +1,161 @@
+import asyncio
+import base64
+import logging
+import os
+import random
+
+import openai
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Which ImageProvider generates renders: "openai", or "stub" to run offline
+RENDER_PROVIDER = os.getenv("RENDER_PROVIDER", "openai")
+# Per-call timeout in seconds, retries per call, and calls in flight per render
+PROVIDER_TIMEOUT = float(os.getenv("PROVIDER_TIMEOUT", "120"))
+PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", "3"))
+PROVIDER_MAX_CONCURRENCY = int(os.getenv("PROVIDER_MAX_CONCURRENCY", "8"))
+# Simulated network latency of the stub provider, in seconds
+STUB_LATENCY = float(os.getenv("STUB_LATENCY", "0.2"))
+
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+async def call_with_retries(fn, *args, timeout: float, retries: int):
+    """Await fn(*args) with a timeout, retrying transient errors with backoff."""
+    for attempt in range(retries + 1):
+        try:
+            return await asyncio.wait_for(fn(*args), timeout)
+        except RETRYABLE_ERRORS as e:
+            if attempt == retries:
+                raise
+            # Exponential backoff with jitter
+            delay = min(2**attempt, 30) * random.uniform(0.5, 1)
+            logger.warning(
+                f"{fn.__qualname__} failed ({e!r}), retry {attempt + 1} in {delay:.1f}s"
+            )
+            await asyncio.sleep(delay)
+
+
+class ImageProvider:
+    """
+    Turns a set of reference views into a single generated image. Subclasses
+    implement upload() and generate(); this class uploads all views
+    concurrently, with timeouts, retries and a concurrency cap.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        timeout: float = PROVIDER_TIMEOUT,
+        max_retries: int = PROVIDER_MAX_RETRIES,
+        max_concurrency: int = PROVIDER_MAX_CONCURRENCY,
+    ):
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def upload(self, name: str, image: bytes) -> str:
+        raise NotImplementedError
+
+    async def generate(self, prompt: str, file_ids: list[str]) -> bytes | None:
+        raise NotImplementedError
+
+    async def aclose(self):
+        pass
+
+    async def _call(self, fn, *args):
+        async with self._semaphore:
+            return await call_with_retries(
+                fn, *args, timeout=self.timeout, retries=self.max_retries
+            )
+
+    async def render(self, prompt: str, views: dict[str, bytes]) -> bytes | None:
+        file_ids = await asyncio.gather(
+            *(self._call(self.upload, name, image) for name, image in views.items())
+        )
+        return await self._call(self.generate, prompt, file_ids)
+
+
+class OpenAIProvider(ImageProvider):
+    def __init__(self, model: str, **kwargs):
+        super().__init__(model, **kwargs)
+        # Timeouts and retries are handled by ImageProvider
+        self.client = AsyncOpenAI(timeout=self.timeout, max_retries=0)
+
+    async def upload(self, name: str, image: bytes) -> str:
+        uploaded = await self.client.files.create(
+            file=(f"{name}.png", image, "image/png"), purpose="user_data"
+        )
+        return uploaded.id
+
+    async def generate(self, prompt: str, file_ids: list[str]) -> bytes | None:
+        response = await self.client.responses.create(
+            model=self.model,
+            input=[
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "input_text",
+                            "text": prompt,
+                        },
+                        *[
+                            {
+                                "type": "input_image",
+                                "file_id": file_id,
+                            }
+                            for file_id in file_ids
+                        ],
+                    ],
+                }
+            ],
+            tools=[{"type": "image_generation"}],
+        )
+        image_data = [
+            output.result
+            for output in response.output
+            if output.type == "image_generation_call"
+        ]
+        return base64.b64decode(image_data[0]) if image_data else None
+
+    async def aclose(self):
+        await self.client.close()
+
+
+class StubProvider(ImageProvider):
+    """
+    Offline stand-in for benchmarks and tests. Sleeps to simulate network
+    latency and "generates" the first uploaded view.
+    """
+
+    def __init__(self, model: str, latency: float = STUB_LATENCY, **kwargs):
+        super().__init__(model, **kwargs)
+        self.latency = latency
+        self._files: dict[str, bytes] = {}
+
+    async def upload(self, name: str, image: bytes) -> str:
+        await asyncio.sleep(self.latency)
+        file_id = f"stub-{len(self._files)}-{name}"
+        self._files[file_id] = image
+        return file_id
+
+    async def generate(self, prompt: str, file_ids: list[str]) -> bytes | None:
+        await asyncio.sleep(self.latency)
+        return self._files[file_ids[0]] if file_ids else None
+
+
+PROVIDERS = {"openai": OpenAIProvider, "stub": StubProvider}
+
+
+def get_provider(model: str, name: str = RENDER_PROVIDER) -> ImageProvider:
+    try:
+        return PROVIDERS[name](model)
+    except KeyError:
+        raise ValueError(f"Unknown render provider {name!r}")
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import and_, or_
+from sqlmodel import select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.main import engine
+
+logger = logging.getLogger(__name__)
+
+# A claimed job is renewed every third of JOB_LEASE seconds while it runs. Once
+# a claim lapses, e.g. because its server worker died, another worker retries it
+JOB_LEASE = float(os.getenv("JOB_LEASE", "300"))
+
+
+class JobQueue:
+    """
+    Background jobs stored as rows with `status` and `lease_expires_at`
+    columns. Every server worker enqueues the pending rows it finds, and a job
+    only runs in the worker that atomically claims it, via `handler(job_id)`.
+    Heavy work goes through `run_in_process`, at most `workers` at a time.
+    """
+
+    def __init__(
+        self,
+        model: Any,
+        key: Any,
+        handler: Callable[[int], Awaitable[None]],
+        workers: int,
+    ):
+        self.model = model
+        self.key = key
+        self.handler = handler
+        self.workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+        # Keep references so running jobs are not garbage collected
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._sweeper: asyncio.Task | None = None
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    async def run_in_process(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.get_executor(), fn, *args)
+
+    def claimable(self, now: datetime):
+        return or_(
+            self.model.status == "queued",
+            and_(
+                self.model.status == "running",
+                or_(
+                    self.model.lease_expires_at.is_(None),
+                    self.model.lease_expires_at < now,
+                ),
+            ),
+        )
+
+    async def claim(self, job_id: int) -> bool:
+        """Mark the job running under a fresh lease, unless someone holds it."""
+        now = datetime.utcnow()
+        async with AsyncSession(engine) as session:
+            claimed = (
+                await session.exec(
+                    update(self.model)
+                    .where(self.key == job_id, self.claimable(now))
+                    .values(
+                        status="running",
+                        lease_expires_at=now + timedelta(seconds=JOB_LEASE),
+                    )
+                    .returning(self.key)
+                )
+            ).first()
+            await session.commit()
+        return claimed is not None
+
+    async def renew(self, job_id: int):
+        while True:
+            await asyncio.sleep(JOB_LEASE / 3)
+            try:
+                async with AsyncSession(engine) as session:
+                    await session.exec(
+                        update(self.model)
+                        .where(self.key == job_id, self.model.status == "running")
+                        .values(
+                            lease_expires_at=datetime.utcnow()
+                            + timedelta(seconds=JOB_LEASE)
+                        )
+                    )
+                    await session.commit()
+            except Exception:
+                logger.exception(f"Renewing the lease on job {job_id} failed")
+
+    async def run(self, job_id: int):
+        if not await self.claim(job_id):
+            return
+        renewal = asyncio.create_task(self.renew(job_id))
+        try:
+            await self.handler(job_id)
+        finally:
+            renewal.cancel()
+
+    def enqueue(self, job_id: int):
+        if job_id in self._tasks:
+            return
+        task = asyncio.create_task(self.run(job_id))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def resume(self):
+        """Enqueue jobs that are queued or whose lease has expired."""
+        async with AsyncSession(engine) as session:
+            job_ids = (
+                await session.exec(
+                    select(self.key).where(self.claimable(datetime.utcnow()))
+                )
+            ).all()
+        for job_id in job_ids:
+            self.enqueue(job_id)
+
+    async def sweep(self):
+        while True:
+            await asyncio.sleep(JOB_LEASE)
+            try:
+                await self.resume()
+            except Exception:
+                logger.exception("Resuming expired jobs failed")
+
+    async def start(self):
+        await self.resume()
+        self._sweeper = asyncio.create_task(self.sweep())
+
+    def shutdown(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            self._sweeper = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
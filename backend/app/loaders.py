@@ -0,0 +1,128 @@
+import asyncio
+from collections import defaultdict
+
+from fastapi import Depends
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.main import get_optional_user, get_session
+from app.models import Attachment, User, Vote
+
+
+class DataLoader:
+    """
+    Collects the keys requested during one event-loop tick and resolves them
+    with a single call to `batch_fn(keys) -> {key: value}`. Missing keys
+    resolve to `default`. Results are cached for the lifetime of the loader.
+    """
+
+    def __init__(self, batch_fn, lock: asyncio.Lock, default=None):
+        self.batch_fn = batch_fn
+        self.default = default
+        self._lock = lock
+        self._cache: dict = {}
+        self._queue: list = []
+        # Keep references so in-flight batches are not garbage collected
+        self._tasks: set[asyncio.Task] = set()
+
+    def load(self, key) -> asyncio.Future:
+        if key in self._cache:
+            return self._cache[key]
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._cache[key] = future
+        self._queue.append(key)
+        if len(self._queue) == 1:
+            # Wait for every task scheduled in this tick to enqueue its keys
+            loop.call_soon(self._start_dispatch)
+        return future
+
+    async def load_many(self, keys) -> list:
+        return await asyncio.gather(*(self.load(key) for key in keys))
+
+    def _start_dispatch(self):
+        task = asyncio.get_running_loop().create_task(self._dispatch())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self):
+        keys, self._queue = self._queue, []
+        try:
+            # The session can only run one query at a time
+            async with self._lock:
+                results = await self.batch_fn(keys)
+        except Exception as e:
+            for key in keys:
+                future = self._cache.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self._cache[key]
+            if future.done():
+                # Cancelled along with the request that loaded it; cache the
+                # result in a fresh future for any later load
+                future = self._cache[key] = asyncio.get_running_loop().create_future()
+            future.set_result(results.get(key, self.default))
+
+
+class Loaders:
+    """
+    Per-request loaders for the relations needed to assemble thread and
+    comment views. Each relation costs one `IN (...)` query per page.
+    """
+
+    def __init__(self, session: AsyncSession, viewer: User | None):
+        self.session = session
+        self.viewer = viewer
+        lock = asyncio.Lock()
+        self.users = DataLoader(self._load_users, lock)
+        self.thread_attachments = DataLoader(self._load_thread_attachments, lock)
+        self.thread_votes = DataLoader(self._load_thread_votes, lock, default=[])
+        self.comment_votes = DataLoader(self._load_comment_votes, lock, default=[])
+
+    async def _load_users(self, ids: list[int]) -> dict[int, User]:
+        users = (await self.session.exec(select(User).where(User.id.in_(ids)))).all()
+        return {u.id: u for u in users}
+
+    async def _load_thread_attachments(
+        self, thread_ids: list[int]
+    ) -> dict[int, Attachment]:
+        attachments = (
+            await self.session.exec(
+                select(Attachment)
+                .where(Attachment.thread_id.in_(thread_ids))
+                .order_by(Attachment.id)
+            )
+        ).all()
+        by_thread = {}
+        for a in attachments:
+            by_thread.setdefault(a.thread_id, a)
+        return by_thread
+
+    async def _load_viewer_votes(self, column, ids: list[int]) -> dict[int, list[Vote]]:
+        """Only the viewer's own votes are loaded; anonymous requests skip the query."""
+        if self.viewer is None:
+            return {}
+        votes = (
+            await self.session.exec(
+                select(Vote).where(Vote.user_id == self.viewer.id, column.in_(ids))
+            )
+        ).all()
+        by_target = defaultdict(list)
+        for v in votes:
+            by_target[getattr(v, column.key)].append(v)
+        return by_target
+
+    async def _load_thread_votes(self, thread_ids: list[int]):
+        return await self._load_viewer_votes(Vote.thread_id, thread_ids)
+
+    async def _load_comment_votes(self, comment_ids: list[int]):
+        return await self._load_viewer_votes(Vote.comment_id, comment_ids)
+
+
+async def get_loaders(
+    session: AsyncSession = Depends(get_session),
+    viewer: User | None = Depends(get_optional_user),
+) -> Loaders:
+    return Loaders(session, viewer)
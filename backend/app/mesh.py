@@ -0,0 +1,118 @@
+import logging
+import os
+
+import numpy as np
+import trimesh
+
+logger = logging.getLogger(__name__)
+
+# Attachment types parsed as meshes after upload
+MESH_FILE_TYPES = {"stl", "glb", "obj", "ply", "off"}
+# Face counts of the simplified meshes built for large uploads, e.g.
+# "50000,200000". Each is stored next to the original as <file>.lod<N>.ply
+LOD_FACE_BUDGETS = sorted(
+    int(budget)
+    for budget in os.getenv("LOD_FACE_BUDGETS", "50000,200000").split(",")
+    if budget
+)
+# A render needs about one face per this many output pixels; finer detail is
+# lost to rasterization
+PIXELS_PER_FACE = 4
+
+
+def load_mesh(file_path: str, file_type: str) -> trimesh.Trimesh:
+    """Load a model file as a single mesh, flattening GLB scenes."""
+    # Stored blobs have no extension, so the type is passed explicitly
+    file_type = file_type.lower()
+    if file_type == "glb":
+        scene = trimesh.load(file_path, file_type=file_type, force="scene")
+        return trimesh.util.concatenate(scene.dump())
+    return trimesh.load_mesh(file_path, file_type=file_type)
+
+
+def validate_mesh(mesh: trimesh.Trimesh) -> list[str]:
+    """Problems that make the mesh unrenderable."""
+    errors = []
+    if np.isnan(mesh.vertices).any() or np.isinf(mesh.vertices).any():
+        errors.append("Mesh contains NaN or infinite values in vertices.")
+    if len(mesh.faces) == 0:
+        errors.append("Mesh has no faces.")
+    return errors
+
+
+def summarize_mesh(mesh: trimesh.Trimesh) -> dict:
+    """
+    Counts, geometry and validation errors of a mesh. Geometry fields are
+    left out when the mesh fails validation.
+    """
+    metadata = {
+        "vertex_count": len(mesh.vertices),
+        "face_count": len(mesh.faces),
+        "errors": validate_mesh(mesh),
+    }
+    if not metadata["errors"]:
+        metadata.update(
+            bounds=mesh.bounds.tolist(),
+            centroid=mesh.centroid.tolist(),
+            extents=mesh.extents.tolist(),
+            is_watertight=bool(mesh.is_watertight),
+        )
+    return metadata
+
+
+def lod_path(file_path: str, face_budget: int) -> str:
+    return f"{file_path}.lod{face_budget}.ply"
+
+
+def build_lods(
+    mesh: trimesh.Trimesh, file_path: str, budgets: list[int] = LOD_FACE_BUDGETS
+) -> list[int]:
+    """
+    Write a simplified copy of the mesh for every budget below its face
+    count, skipping ones already on disk. Returns the budgets available.
+    """
+    built = []
+    for budget in budgets:
+        if budget >= len(mesh.faces):
+            break
+        path = lod_path(file_path, budget)
+        if not os.path.exists(path):
+            simplified = mesh.simplify_quadric_decimation(face_count=budget)
+            tmp_path = f"{path}.tmp"
+            simplified.export(tmp_path, file_type="ply")
+            os.replace(tmp_path, path)
+            logger.info(f"Built LOD of {file_path} with {len(simplified.faces)} faces")
+        built.append(budget)
+    return built
+
+
+def select_lod(file_path: str, file_type: str, resolution: int) -> tuple[str, str]:
+    """
+    The smallest LOD with enough faces for a resolution x resolution render,
+    as (path, file_type). Falls back to the original when no LOD that large
+    has been built, e.g. because the mesh is already small enough.
+    """
+    target = resolution * resolution // PIXELS_PER_FACE
+    for budget in LOD_FACE_BUDGETS:
+        if budget >= target:
+            path = lod_path(file_path, budget)
+            if os.path.exists(path):
+                return path, "ply"
+    return file_path, file_type
+
+
+def process_mesh(file_path: str, file_type: str) -> dict:
+    """
+    Parse an upload once: summarize its geometry and build its LODs. Runs
+    inside a worker process.
+    """
+    try:
+        mesh = load_mesh(file_path, file_type)
+    except Exception as e:
+        logger.exception("Failed to load mesh")
+        return {"errors": [f"Failed to load mesh: {e}"]}
+
+    metadata = summarize_mesh(mesh)
+    if not metadata["errors"]:
+        metadata["lods"] = build_lods(mesh, file_path)
+    return metadata
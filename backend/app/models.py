@@ -1,7 +1,25 @@
 from typing import Optional, List
+from sqlalchemy import Computed, Index, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlmodel import JSON, Column, SQLModel, Field, Relationship
 from datetime import datetime
 
+# Text search configuration for the generated search_vector columns
+SEARCH_CONFIG = "english"
+
+
+def search_vector_column(*weighted_columns: tuple[str, str]) -> Column:
+    """
+    A stored tsvector generated from (column, weight) pairs. The ORM never
+    loads it (see exclude_properties); /search queries it through __table__.
+    """
+    document = " || ".join(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce({column}, '')), '{weight}')"
+        for column, weight in weighted_columns
+    )
+    return Column(TSVECTOR, Computed(document, persisted=True))
+
+
 # ---------- USER ----------
 
 
@@ -14,46 +32,102 @@ class User(SQLModel, table=True):
     role: str = Field(default="user", regex="^(user|moderator|admin)$")
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
-    threads: List["Thread"] = Relationship(back_populates="user")
-    comments: List["Comment"] = Relationship(back_populates="user")
-    votes: List["Vote"] = Relationship(back_populates="user")
+    # passive_deletes: leave dependent rows to the database instead of lazily
+    # loading them on delete, which the async session cannot do
+    threads: List["Thread"] = Relationship(back_populates="user", passive_deletes=True)
+    comments: List["Comment"] = Relationship(
+        back_populates="user", passive_deletes=True
+    )
+    votes: List["Vote"] = Relationship(back_populates="user", passive_deletes=True)
 
 
 # ---------- THREAD ----------
 
 
 class Thread(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_thread_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_thread_tags", "tags", postgresql_using="gin"),
+        # Category feeds read in keyset order straight from the index
+        Index("ix_thread_category_created_at", "category", "created_at", "id"),
+        Index("ix_thread_created_at", "created_at", "id"),
+    )
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.id")
     title: str
     content: Optional[str]
     summary: Optional[str]
     category: Optional[str]
-    tags: Optional[List[str]] = Field(
-        default=None, sa_column=Column(JSON)
-    )  # PostgreSQL array
+    # JSON array of tag names; counts per tag are kept in TagCount
+    tags: Optional[List[str]] = Field(default=None, sa_column=Column(JSONB))
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # Denormalized vote counters, maintained by update_vote
+    score: int = Field(default=0)
+    upvotes: int = Field(default=0)
+    downvotes: int = Field(default=0)
+    # Full-text search document, generated by Postgres
+    search_vector: Optional[str] = Field(
+        default=None,
+        exclude=True,
+        sa_column=search_vector_column(
+            ("title", "A"), ("summary", "B"), ("content", "C")
+        ),
+    )
 
     user: Optional[User] = Relationship(back_populates="threads")
     comments: List["Comment"] = Relationship(
-        back_populates="thread", cascade_delete=True
+        back_populates="thread", cascade_delete=True, passive_deletes=True
     )
     attachments: List["Attachment"] = Relationship(
-        back_populates="thread", cascade_delete=True
+        back_populates="thread", cascade_delete=True, passive_deletes=True
     )
 
 
+# ---------- TAG COUNT ----------
+
+
+class TagCount(SQLModel, table=True):
+    # Threads per tag, maintained by the thread endpoints
+    tag: str = Field(primary_key=True)
+    count: int = Field(default=0, index=True)
+
+
 # ---------- COMMENT ----------
 
 
 class Comment(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_comment_search_vector", "search_vector", postgresql_using="gin"),
+        # Comments of a thread, and replies to a comment, in keyset order
+        Index("ix_comment_thread_id_created_at", "thread_id", "created_at", "id"),
+        Index(
+            "ix_comment_parent_comment_id_created_at",
+            "parent_comment_id",
+            "created_at",
+            "id",
+        ),
+    )
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
+
     id: Optional[int] = Field(default=None, primary_key=True)
     thread_id: int = Field(foreign_key="thread.id", ondelete="CASCADE")
     user_id: int = Field(foreign_key="user.id")
     content: str
     parent_comment_id: Optional[int] = Field(default=None, foreign_key="comment.id")
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Denormalized vote counters, maintained by update_vote
+    score: int = Field(default=0)
+    upvotes: int = Field(default=0)
+    downvotes: int = Field(default=0)
+    # Full-text search document, generated by Postgres
+    search_vector: Optional[str] = Field(
+        default=None,
+        exclude=True,
+        sa_column=search_vector_column(("content", "C")),
+    )
 
     thread: Optional[Thread] = Relationship(back_populates="comments")
     user: Optional[User] = Relationship(back_populates="comments")
@@ -63,13 +137,31 @@ class Comment(SQLModel, table=True):
 
 
 class Vote(SQLModel, table=True):
+    __table_args__ = (
+        # One vote per user and target
+        Index(
+            "uq_vote_user_thread",
+            "user_id",
+            "thread_id",
+            unique=True,
+            postgresql_where=text("thread_id IS NOT NULL"),
+        ),
+        Index(
+            "uq_vote_user_comment",
+            "user_id",
+            "comment_id",
+            unique=True,
+            postgresql_where=text("comment_id IS NOT NULL"),
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    user_id: int = Field(foreign_key="user.id")
+    user_id: int = Field(foreign_key="user.id", index=True)
     thread_id: Optional[int] = Field(
-        default=None, foreign_key="thread.id", ondelete="CASCADE"
+        default=None, foreign_key="thread.id", ondelete="CASCADE", index=True
     )
     comment_id: Optional[int] = Field(
-        default=None, foreign_key="comment.id", ondelete="CASCADE"
+        default=None, foreign_key="comment.id", ondelete="CASCADE", index=True
     )
     value: int = Field(ge=-1, le=1)
 
@@ -81,10 +173,16 @@ class Vote(SQLModel, table=True):
 
 class Attachment(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    thread_id: int = Field(foreign_key="thread.id", ondelete="CASCADE")
-    file_url: str
+    thread_id: int = Field(foreign_key="thread.id", ondelete="CASCADE", index=True)
+    file_url: str = Field(index=True)
     file_type: str  # Consider enum: image, video, 3d_model, pdf
     description: Optional[str] = None
+    # sha256 of the contents and size in bytes, computed while uploading. The
+    # hash names the blob in the attachment store
+    content_hash: Optional[str] = Field(default=None, index=True)
+    size: Optional[int] = None
+    # Small preview image, rendered in the background after upload
+    thumbnail_path: Optional[str] = None
 
     thread: Optional[Thread] = Relationship(back_populates="attachments")
 
@@ -97,3 +195,46 @@ class AccessKey(SQLModel, table=True):
     user_id: Optional[int] = Field(default=None, foreign_key="user.id")
     key: str = Field(index=True, unique=True)
     used: bool = Field(default=False)
+
+
+# ---------- RENDER JOB ----------
+
+
+class RenderJob(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    attachment_id: int = Field(foreign_key="attachment.id", ondelete="CASCADE")
+    status: str = Field(
+        default="queued", regex="^(queued|running|done|failed)$", index=True
+    )
+    error: Optional[str] = None
+    result_path: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+    # Until when the server worker running the job holds it
+    lease_expires_at: Optional[datetime] = None
+
+
+# ---------- MESH METADATA ----------
+
+
+class MeshMetadata(SQLModel, table=True):
+    # Geometry summary of an uploaded model, extracted in the background
+    attachment_id: int = Field(
+        foreign_key="attachment.id", primary_key=True, ondelete="CASCADE"
+    )
+    status: str = Field(
+        default="queued", regex="^(queued|running|done|failed)$", index=True
+    )
+    vertex_count: Optional[int] = None
+    face_count: Optional[int] = None
+    bounds: Optional[List[List[float]]] = Field(default=None, sa_column=Column(JSON))
+    centroid: Optional[List[float]] = Field(default=None, sa_column=Column(JSON))
+    extents: Optional[List[float]] = Field(default=None, sa_column=Column(JSON))
+    is_watertight: Optional[bool] = None
+    # Validation errors; a mesh with errors cannot be rendered
+    errors: Optional[List[str]] = Field(default=None, sa_column=Column(JSON))
+    # Face budgets of the simplified copies stored next to the file
+    lods: Optional[List[int]] = Field(default=None, sa_column=Column(JSON))
+    finished_at: Optional[datetime] = None
+    # Until when the server worker extracting it holds the job
+    lease_expires_at: Optional[datetime] = None
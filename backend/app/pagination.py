@@ -0,0 +1,71 @@
+import base64
+import json
+from datetime import datetime
+from typing import Generic, TypeVar
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 100
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = None
+
+
+def encode_keyset(values: list) -> str:
+    """Opaque cursor for any JSON-serializable sort key."""
+    raw = json.dumps(values).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_keyset(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    return encode_keyset([created_at.isoformat(), id])
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        created_at, id = decode_keyset(cursor)
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(statement, model, cursor: str | None, limit: int):
+    """
+    Apply keyset pagination on (created_at, id), newest first.
+    Fetches one extra row so callers can tell whether another page exists.
+    """
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        statement = statement.where(
+            tuple_(model.created_at, model.id) < tuple_(created_at, id)
+        )
+    return statement.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+
+def next_cursor(rows: list, limit: int, key=lambda row: row) -> str | None:
+    """
+    Trim the look-ahead row added by paginate() and return the cursor for the
+    following page, or None on the last page.
+    """
+    if len(rows) <= limit:
+        return None
+    del rows[limit:]
+    last = key(rows[-1])
+    return encode_cursor(last.created_at, last.id)
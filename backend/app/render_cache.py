@@ -0,0 +1,105 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+def file_hash(file_path: str) -> str:
+    with open(file_path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def render_cache_key(content_hash: str, params: dict) -> str:
+    """Hash of the mesh's sha256 plus the parameters that shape the render."""
+    digest = hashlib.sha256(content_hash.encode("ascii"))
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """
+    Finished renders stored on disk as <key>.png. When the directory grows
+    past `max_bytes`, the least recently used entries are evicted; reads
+    bump an entry's mtime. `put` may be called from several threads at once.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._sizes: dict[str, int] | None = None
+        # Guards _sizes and eviction
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.png")
+
+    def get(self, key: str) -> str | None:
+        path = self.path(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, key: str, data: bytes) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        # Unique per writer: two jobs may render the same key at once
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        with self._lock:
+            self._entries()[path] = len(data)
+            self._evict(keep=path)
+        return path
+
+    def _entries(self) -> dict[str, int]:
+        # Scanned once; afterwards tracked in memory. Call with the lock held
+        if self._sizes is None:
+            self._sizes = {}
+            if os.path.isdir(self.directory):
+                for entry in os.scandir(self.directory):
+                    if entry.name.endswith(".png"):
+                        self._sizes[entry.path] = entry.stat().st_size
+        return self._sizes
+
+    def _evict(self, keep: str):
+        sizes = self._entries()
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+
+        def mtime(path):
+            try:
+                return os.path.getmtime(path)
+            except FileNotFoundError:
+                return 0
+
+        for path in sorted(sizes, key=mtime):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            total -= sizes.pop(path)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            logger.info(f"Evicted cached render {path}")
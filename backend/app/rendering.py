@@ -0,0 +1,289 @@
+import asyncio
+import io
+import logging
+import os
+import time
+from textwrap import dedent
+
+from dotenv import load_dotenv
+from OpenGL.error import GLError
+import pyrender
+import numpy as np
+from PIL import Image
+
+from app.image_providers import RENDER_PROVIDER, ImageProvider, get_provider
+from app.mesh import LOD_FACE_BUDGETS, load_mesh, select_lod, validate_mesh
+
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s:%(lineno)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+# Offscreen GL contexts by viewport size. Creating one is expensive, so each
+# render worker keeps its renderers for the life of the process
+_renderers: dict[tuple[int, int], pyrender.OffscreenRenderer] = {}
+
+# (azimuth, elevation) in degrees for each reference view
+ALL_VIEWPOINTS = {
+    "front": (0, 10),
+    "back": (180, 10),
+    "left": (90, 10),
+    "right": (-90, 10),
+    "top": (0, 90),
+    "bottom": (0, -90),
+    "angled": (45, 30),
+}
+# Comma-separated subset of ALL_VIEWPOINTS to render, e.g. "front,top,angled"
+VIEWPOINTS = {
+    name: ALL_VIEWPOINTS[name]
+    for name in os.getenv("RENDER_VIEWPOINTS", ",".join(ALL_VIEWPOINTS)).split(",")
+}
+RENDER_SIZE = 800
+# Preview images shown in thread listings
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", "256"))
+THUMBNAIL_VIEWPOINT = "angled"
+IMAGE_MODEL = "gpt-4.1-mini"
+# Bump whenever RENDER_PROMPT changes so cached renders are not reused
+PROMPT_VERSION = 1
+
+# Prompt for the image model
+RENDER_PROMPT = dedent("""
+    Given a complete set of reference images (front, back, left, right, top, bottom, and an angled perspective) of a 3D-model generate a high-quality, photorealistic render as if it were professionally photographed in a studio environment.
+
+    The final image should:
+    - Use realistic materials (e.g., matte composites, brushed metal, polycarbonate) with subtle lighting and shadows.
+
+    - Be composed with a clean background (e.g., gradient gray or studio white) and soft reflections to enhance depth.
+
+    - Contain the entire model in the frame, ensuring all angles are visible and well-lit.
+
+    This render should visually communicate the object's readiness for real-world application, balancing aesthetics with realism and technical credibility.
+""")
+
+
+class RenderError(Exception):
+    pass
+
+
+def render_params() -> dict:
+    """Everything besides the mesh itself that determines the final render."""
+    return {
+        "viewpoints": VIEWPOINTS,
+        "size": RENDER_SIZE,
+        "model": IMAGE_MODEL,
+        "prompt_version": PROMPT_VERSION,
+        "lod_face_budgets": LOD_FACE_BUDGETS,
+        # Stub renders must never be served as real ones
+        "provider": RENDER_PROVIDER,
+    }
+
+
+def probe_renderer(renderer: pyrender.OffscreenRenderer):
+    """Raise if the renderer's GL context no longer works."""
+    scene = pyrender.Scene()
+    scene.add(pyrender.OrthographicCamera(xmag=1.0, ymag=1.0))
+    renderer.render(scene, flags=pyrender.RenderFlags.DEPTH_ONLY)
+
+
+def get_renderer(width: int, height: int) -> pyrender.OffscreenRenderer:
+    """A cached renderer for the size, checked with a probe render first."""
+    key = (width, height)
+    renderer = _renderers.get(key)
+    if renderer is not None:
+        try:
+            probe_renderer(renderer)
+        except Exception:
+            logger.warning(f"Offscreen renderer {key} is unhealthy, recreating it")
+            discard_renderer(width, height)
+            renderer = None
+    if renderer is None:
+        renderer = pyrender.OffscreenRenderer(
+            viewport_width=width, viewport_height=height
+        )
+        _renderers[key] = renderer
+    return renderer
+
+
+def discard_renderer(width: int, height: int):
+    renderer = _renderers.pop((width, height), None)
+    if renderer is not None:
+        try:
+            renderer.delete()
+        except Exception:
+            logger.exception("Failed to delete offscreen renderer")
+
+
+def analyze_glb(
+    file_path, file_type, viewpoints=None, resolution=RENDER_SIZE, image_format="PNG"
+):
+    """
+    Render the mesh from each viewpoint at resolution x resolution. Returns
+    the views as in-memory image buffers under "views", or an "error".
+    """
+    try:
+        combined = load_mesh(file_path, file_type)
+    except Exception as e:
+        logger.exception("Failed to load mesh")
+        return {"error": f"Failed to load mesh: {e}"}
+
+    # Check for mesh validity
+    errors = validate_mesh(combined)
+    if errors:
+        logger.error(errors[0])
+        return {"error": errors[0]}
+    if not combined.is_watertight:
+        logger.warning("Mesh is not watertight. Proceeding, but rendering may fail.")
+
+    # Model center and size
+    center = combined.bounding_box.centroid
+    size = combined.bounding_box.extents
+    distance = max(size) * 2.5
+
+    def get_camera_pose(azimuth_deg, elevation_deg, distance, center):
+        az = np.radians(azimuth_deg)
+        el = np.radians(elevation_deg)
+        x = distance * np.cos(el) * np.sin(az)
+        y = distance * np.sin(el)
+        z = distance * np.cos(el) * np.cos(az)
+        position = np.array([x, y, z]) + center
+
+        forward = center - position
+        forward /= np.linalg.norm(forward)
+
+        if abs(elevation_deg) == 90:
+            up = np.array([0, 0, 1 if elevation_deg > 0 else -1])
+        else:
+            up = np.array([0, 1, 0])
+
+        # Right-hand coordinate system
+        right = np.cross(forward, up)
+        if np.linalg.norm(right) < 1e-6:
+            right = np.array([1, 0, 0])  # fallback
+        else:
+            right /= np.linalg.norm(right)
+
+        true_up = np.cross(right, forward)
+
+        # Build 4x4 pose matrix
+        pose = np.eye(4)
+        pose[:3, 0] = right
+        pose[:3, 1] = true_up
+        pose[:3, 2] = -forward  # camera looks along -Z
+        pose[:3, 3] = position
+        return pose
+
+    # Build the scene once; only the camera and light move between views, so
+    # the geometry is uploaded to the GL context a single time
+    scene = pyrender.Scene()
+    try:
+        scene.add(pyrender.Mesh.from_trimesh(combined, smooth=False))
+    except Exception as e:
+        logger.error(f"Failed to add mesh to scene: {e}")
+        return {"error": f"Failed to add mesh to scene: {e}"}
+    camera_node = scene.add(pyrender.PerspectiveCamera(yfov=np.pi / 3.0))
+    light_node = scene.add(pyrender.DirectionalLight(color=np.ones(3), intensity=3.0))
+
+    renderer = get_renderer(resolution, resolution)
+    views, render_times = {}, {}
+    for name, (az, el) in (viewpoints or VIEWPOINTS).items():
+        pose = get_camera_pose(az, el, distance, center)
+        if not np.isfinite(pose).all():
+            logger.error(f"Invalid pose matrix for view {name}: contains NaN or Inf.")
+            continue
+        scene.set_pose(camera_node, pose)
+        scene.set_pose(light_node, pose)
+        try:
+            start = time.perf_counter()
+            try:
+                color, _ = renderer.render(scene)
+            except GLError:
+                # The context may be broken; retry once on a fresh one
+                logger.exception(f"GL error rendering view {name}, retrying")
+                discard_renderer(resolution, resolution)
+                renderer = get_renderer(resolution, resolution)
+                color, _ = renderer.render(scene)
+            render_times[name] = time.perf_counter() - start
+            buffer = io.BytesIO()
+            Image.fromarray(color).save(buffer, format=image_format)
+            views[name] = buffer.getvalue()
+        except np.linalg.LinAlgError as e:
+            logger.error(f"Rendering failed for view {name}: {e}")
+            continue
+        except Exception as e:
+            logger.error(f"Unexpected error during rendering for view {name}: {e}")
+            continue
+    return {"views": views, "render_times": render_times}
+
+
+def thumbnail_path(file_path: str) -> str:
+    return f"{file_path}.thumb.webp"
+
+
+def render_thumbnail(file_path: str, file_type: str) -> str:
+    """
+    Render a single THUMBNAIL_SIZE WebP preview next to the file, unless one
+    exists already. Returns its path. Runs inside a worker process.
+    """
+    path = thumbnail_path(file_path)
+    if os.path.exists(path):
+        return path
+
+    mesh_path, mesh_type = select_lod(file_path, file_type, THUMBNAIL_SIZE)
+    metadata = analyze_glb(
+        mesh_path,
+        mesh_type,
+        viewpoints={THUMBNAIL_VIEWPOINT: ALL_VIEWPOINTS[THUMBNAIL_VIEWPOINT]},
+        resolution=THUMBNAIL_SIZE,
+        image_format="WEBP",
+    )
+    if "error" in metadata:
+        raise RenderError(metadata["error"])
+    if not metadata["views"]:
+        raise RenderError("Thumbnail view failed to render.")
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(metadata["views"][THUMBNAIL_VIEWPOINT])
+    os.replace(tmp_path, path)
+    return path
+
+
+async def generate_render(
+    views: dict[str, bytes], provider: ImageProvider | None = None
+) -> bytes:
+    """Upload the views concurrently and have the image model render them."""
+    provider = provider or get_provider(IMAGE_MODEL)
+    try:
+        logger.info("Uploading images and generating render...")
+        image = await provider.render(RENDER_PROMPT, views)
+    finally:
+        await provider.aclose()
+
+    logger.info("Render generation completed.")
+    if not image:
+        raise RenderError("The image model did not return a render.")
+    return image
+
+
+def render_model(
+    file_path: str, file_type: str, provider: ImageProvider | None = None
+) -> bytes:
+    """
+    Render the model from several viewpoints and have the image model turn
+    the views into a photorealistic PNG. Runs inside a render worker process.
+    """
+    # Millions of faces add nothing at RENDER_SIZE; render a simplified copy
+    file_path, file_type = select_lod(file_path, file_type, RENDER_SIZE)
+    metadata = analyze_glb(file_path, file_type)
+    if "error" in metadata:
+        raise RenderError(metadata["error"])
+
+    views = metadata["views"]
+    if not views:
+        raise RenderError(
+            "No rendered images found. Ensure the model is valid and rendering was successful."
+        )
+    return asyncio.run(generate_render(views, provider))
@@ -0,0 +1,152 @@
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Iterable, NamedTuple
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from app.cache import TTLCache
+from app.http_cache import REVALIDATE_CACHE_CONTROL, is_not_modified, not_modified
+
+# Serialized anonymous responses kept per worker. Writes invalidate the
+# entries they affect in this worker; RESPONSE_CACHE_TTL bounds how stale
+# other workers' copies can get
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "10"))
+
+# Tag of the first page of the unfiltered thread listing
+LATEST_THREADS = "threads:latest"
+
+
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+
+def serialize(model: BaseModel) -> CachedResponse:
+    body = model.model_dump_json().encode("utf-8")
+    return CachedResponse(
+        body, f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    )
+
+
+def cache_key(request: Request) -> str:
+    """The path plus its query parameters in a canonical order."""
+    params = urlencode(sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{params}"
+
+
+class CacheBackend:
+    """
+    Where ResponseCache keeps entries. Each entry carries tags, and
+    invalidating a tag drops every entry carrying it. A backend shared between
+    workers, e.g. on Redis, must apply invalidations to all of them.
+    """
+
+    def get(self, key: str) -> CachedResponse | None:
+        raise NotImplementedError
+
+    def set(self, key: str, value: CachedResponse, tags: Iterable[str]):
+        raise NotImplementedError
+
+    def invalidate(self, tags: Iterable[str]):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class LRUBackend(CacheBackend):
+    """A TTLCache plus an index of the keys carrying each tag."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._entries = TTLCache(maxsize, ttl, on_remove=self._untag)
+        self._tagged: dict[str, set[str]] = {}
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        return None if entry is None else entry[0]
+
+    def set(self, key, value, tags):
+        # Untag the entry being replaced before tagging its successor
+        self._entries.invalidate(key)
+        tags = tuple(tags)
+        for tag in tags:
+            self._tagged.setdefault(tag, set()).add(key)
+        self._entries.set(key, (value, tags))
+
+    def invalidate(self, tags):
+        for tag in tags:
+            for key in self._tagged.pop(tag, ()):
+                self._entries.invalidate(key)
+
+    def _untag(self, key: str, entry: tuple[CachedResponse, tuple[str, ...]]):
+        for tag in entry[1]:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+    def stats(self):
+        return self._entries.stats()
+
+
+class ResponseCache:
+    def __init__(self, backend: CacheBackend, history: int = 10000):
+        self.backend = backend
+        # Bumped by every invalidation. A response built from data read at
+        # generation g is not stored if one of its tags was invalidated after g
+        self.generation = 0
+        # Generation each recently invalidated tag was last invalidated at,
+        # oldest first. Beyond `history` tags the oldest are forgotten, and
+        # responses read before them are not stored
+        self.history = history
+        self._invalidated: OrderedDict[str, int] = OrderedDict()
+        self._forgotten = 0
+
+    def get(self, key: str) -> CachedResponse | None:
+        return self.backend.get(key)
+
+    def set(
+        self, key: str, value: CachedResponse, tags: Iterable[str], generation: int
+    ):
+        tags = tuple(tags)
+        if generation < self._forgotten or any(
+            self._invalidated.get(tag, 0) > generation for tag in tags
+        ):
+            return
+        self.backend.set(key, value, tags)
+
+    def invalidate(self, *tags: str):
+        """Drop entries carrying any of `tags`. Call after committing."""
+        self.generation += 1
+        for tag in tags:
+            self._invalidated[tag] = self.generation
+            self._invalidated.move_to_end(tag)
+        while len(self._invalidated) > self.history:
+            _, self._forgotten = self._invalidated.popitem(last=False)
+        self.backend.invalidate(tags)
+
+    def stats(self) -> dict:
+        return self.backend.stats()
+
+
+response_cache = ResponseCache(LRUBackend(RESPONSE_CACHE_SIZE, RESPONSE_CACHE_TTL))
+
+
+def send_cached(request: Request, cached: CachedResponse, shared: bool) -> Response:
+    """
+    Send a serialized response, or 304 if the client has it. Responses that
+    depend on the viewer are marked private.
+    """
+    headers = {
+        "ETag": cached.etag,
+        "Cache-Control": REVALIDATE_CACHE_CONTROL if shared else "private, no-cache",
+        "Vary": "Authorization",
+    }
+    if is_not_modified(request, cached.etag, None):
+        return not_modified(headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
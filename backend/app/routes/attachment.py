@@ -0,0 +1,178 @@
+import logging
+import os
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.http_cache import http_date, is_not_modified, not_modified
+from app.jobs import JobQueue
+from app.main import engine, get_session
+from app.mesh import process_mesh
+from app.models import Attachment, MeshMetadata
+from app.response_cache import response_cache
+from app.rendering import render_thumbnail
+
+app = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Uploaded meshes are parsed, simplified and thumbnailed in their own processes,
+# MESH_WORKERS at a time
+MESH_WORKERS = int(os.getenv("MESH_WORKERS", "1"))
+
+# Thumbnails only change if the attachment store is rebuilt
+THUMBNAIL_CACHE_CONTROL = "public, max-age=86400"
+
+RESULT_FIELDS = (
+    "vertex_count",
+    "face_count",
+    "bounds",
+    "centroid",
+    "extents",
+    "is_watertight",
+    "errors",
+    "lods",
+)
+
+
+class MeshMetadataView(BaseModel):
+    attachment_id: int
+    status: str
+    vertex_count: int | None = None
+    face_count: int | None = None
+    bounds: list[list[float]] | None = None
+    centroid: list[float] | None = None
+    extents: list[float] | None = None
+    is_watertight: bool | None = None
+    errors: list[str] | None = None
+    lods: list[int] | None = None
+
+
+async def find_metadata_for_content(
+    session: AsyncSession, attachment: Attachment
+) -> MeshMetadata | None:
+    """Finished metadata of another attachment with the same contents."""
+    if attachment.content_hash is None:
+        return None
+    return (
+        await session.exec(
+            select(MeshMetadata)
+            .join(Attachment, Attachment.id == MeshMetadata.attachment_id)
+            .where(
+                Attachment.content_hash == attachment.content_hash,
+                Attachment.id != attachment.id,
+                MeshMetadata.status == "done",
+            )
+            .limit(1)
+        )
+    ).first()
+
+
+async def run_mesh_metadata_job(attachment_id: int):
+    """Extract metadata for a job claimed by this worker."""
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        metadata = await session.get(MeshMetadata, attachment_id)
+        attachment = await session.get(Attachment, attachment_id)
+        if metadata is None or attachment is None:
+            return
+        existing = await find_metadata_for_content(session, attachment)
+
+    try:
+        if existing is not None:
+            # Same bytes were parsed before; LODs live next to the shared blob
+            result = {field: getattr(existing, field) for field in RESULT_FIELDS}
+        else:
+            result = await mesh_jobs.run_in_process(
+                process_mesh,
+                attachment.file_url,
+                attachment.file_type,
+            )
+        for field, value in result.items():
+            setattr(metadata, field, value)
+        metadata.status = "done"
+    except Exception as e:
+        logger.exception(f"Mesh metadata for attachment {attachment_id} failed")
+        metadata.status = "failed"
+        metadata.errors = [str(e)]
+    metadata.finished_at = datetime.utcnow()
+
+    if metadata.status == "done" and not metadata.errors:
+        try:
+            attachment.thumbnail_path = await mesh_jobs.run_in_process(
+                render_thumbnail,
+                attachment.file_url,
+                attachment.file_type,
+            )
+        except Exception:
+            # The listing falls back to the full model
+            logger.exception(f"Thumbnail for attachment {attachment_id} failed")
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add(metadata)
+        session.add(attachment)
+        await session.commit()
+    if attachment.thumbnail_path:
+        # Thread views link the new thumbnail
+        response_cache.invalidate(f"thread:{attachment.thread_id}")
+
+
+mesh_jobs = JobQueue(
+    MeshMetadata, MeshMetadata.attachment_id, run_mesh_metadata_job, MESH_WORKERS
+)
+
+
+@app.on_event("startup")
+async def resume_mesh_metadata_jobs():
+    """Pick up extractions that are queued, or whose worker stopped renewing them."""
+    await mesh_jobs.start()
+
+
+@app.on_event("shutdown")
+def shutdown_mesh_executor():
+    mesh_jobs.shutdown()
+
+
+@app.get("/attachments/{attachment_id}/metadata", response_model=MeshMetadataView)
+async def read_mesh_metadata(
+    attachment_id: int, session: AsyncSession = Depends(get_session)
+):
+    """
+    Geometry extracted from the uploaded model. `status` is "queued" or
+    "running" until extraction finishes.
+    """
+    metadata = await session.get(MeshMetadata, attachment_id)
+    if not metadata:
+        raise HTTPException(status_code=404, detail="Mesh metadata not found")
+    return MeshMetadataView(**metadata.model_dump())
+
+
+@app.get("/attachments/{attachment_id}/thumbnail")
+async def read_thumbnail(
+    attachment_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+):
+    attachment = await session.get(Attachment, attachment_id)
+    if not attachment or not attachment.thumbnail_path:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    try:
+        stat = os.stat(attachment.thumbnail_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+
+    headers = {
+        "ETag": f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+        "Cache-Control": THUMBNAIL_CACHE_CONTROL,
+        "Last-Modified": http_date(stat.st_mtime),
+    }
+    if is_not_modified(request, headers["ETag"], stat.st_mtime):
+        return not_modified(headers)
+    return FileResponse(
+        attachment.thumbnail_path,
+        media_type="image/webp",
+        headers=headers,
+        stat_result=stat,
+    )
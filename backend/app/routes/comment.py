@@ -1,11 +1,24 @@
+import asyncio
 from datetime import datetime
+from app.loaders import Loaders, get_loaders
 from app.main import get_current_user, get_session
 from app.models import Comment, User, Vote
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
-from sqlmodel import Session, select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import case, exists, func, literal, true, tuple_
+from sqlalchemy.orm import aliased
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    Page,
+    decode_cursor,
+    encode_cursor,
+    next_cursor,
+    paginate,
+)
 from app.routes.user import UserView
 
 app = APIRouter()
@@ -25,109 +38,233 @@ class CommentView(BaseModel):
     created_at: datetime
     parent_comment_id: int | None = None
     user: UserView
-    vote: list[Vote] = []
+    score: int = 0
+    upvotes: int = 0
+    downvotes: int = 0
+    vote: list[Vote] = []  # the viewer's own vote, if any
+
+
+class CommentNode(CommentView):
+    depth: int
+    replies: list["CommentNode"] = []
+    # More replies than were returned exist. Fetch them from
+    # /threads/{thread_id}/comment-tree?parent_id={id}&cursor={replies_cursor};
+    # a null cursor means from the first reply
+    more_replies: bool = False
+    replies_cursor: str | None = None
 
 
 @app.post("/comment", response_model=Comment)
-def create_comment(
+async def create_comment(
     comment: CommentCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
     if comment.user_id is None:
         comment.user_id = user.id
+    if comment.parent_id is not None:
+        parent = await session.get(Comment, comment.parent_id)
+        if not parent or parent.thread_id != comment.thread_id:
+            raise HTTPException(status_code=400, detail="Invalid parent comment")
     new_comment = Comment(
         thread_id=comment.thread_id,
         content=comment.content,
-        parent_id=comment.parent_id,
+        parent_comment_id=comment.parent_id,
         user_id=comment.user_id,
     )
     session.add(new_comment)
-    session.commit()
-    session.refresh(new_comment)
+    await session.commit()
+    await session.refresh(new_comment)
     return new_comment
 
 
-@app.get("/comments", response_model=list[CommentView])
-def read_all_comments(
-    skip: int = 0, limit: int = 10, session: Session = Depends(get_session)
-):
-    comments = session.exec(
-        select(Comment)
-        .options(
-            selectinload(Comment.user),  # Load associated User
-        )
-        .where(Comment.user_id == User.id)
-        .offset(skip)
-        .order_by(Comment.id.desc())
+async def build_comment_view(c: Comment, loaders: Loaders) -> CommentView:
+    u, votes = await asyncio.gather(
+        loaders.users.load(c.user_id),
+        loaders.comment_votes.load(c.id),
+    )
+    return CommentView(
+        id=c.id,
+        thread_id=c.thread_id,
+        content=c.content,
+        created_at=c.created_at,
+        parent_comment_id=c.parent_comment_id,
+        user=UserView(
+            id=u.id,
+            username=u.username,
+            email=u.email,
+            role=u.role,
+            organization=u.organization,
+        ),
+        score=c.score,
+        upvotes=c.upvotes,
+        downvotes=c.downvotes,
+        vote=votes,
     )
-    votes = session.exec(select(Vote).where(Vote.comment_id is not None)).all()
-
-    view = []
-    for c in comments:
-        comment = CommentView(
-            id=c.id,
-            thread_id=c.thread_id,
-            content=c.content,
-            created_at=c.created_at,
-            parent_comment_id=c.parent_comment_id,
-            user=UserView(
-                id=c.user.id,
-                username=c.user.username,
-                email=c.user.email,
-                role=c.user.role,
-                organization=c.user.organization,
-            ),
-            vote=[v for v in votes if v.comment_id == c.id] if votes else [],
-        )
-        view.append(comment)
 
-    return view
+
+@app.get("/comments", response_model=Page[CommentView])
+async def read_all_comments(
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_session),
+    loaders: Loaders = Depends(get_loaders),
+):
+    comments = (
+        await session.exec(paginate(select(Comment), Comment, cursor, limit))
+    ).all()
+    cursor = next_cursor(comments, limit)
+    view = await asyncio.gather(*(build_comment_view(c, loaders) for c in comments))
+    return Page(items=view, next_cursor=cursor)
+
+
+@app.get("/comments/{thread_id}", response_model=Page[CommentView])
+async def read_comments(
+    thread_id: int,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_session),
+    loaders: Loaders = Depends(get_loaders),
+):
+    comments = (
+        await session.exec(
+            paginate(
+                select(Comment).where(Comment.thread_id == thread_id),
+                Comment,
+                cursor,
+                limit,
+            )
+        )
+    ).all()
+    cursor = next_cursor(comments, limit)
+    view = await asyncio.gather(*(build_comment_view(c, loaders) for c in comments))
+    return Page(items=view, next_cursor=cursor)
 
 
-@app.get("/comments/{thread_id}", response_model=list[CommentView])
-def read_comments(thread_id: int, session: Session = Depends(get_session)):
-    comments = session.exec(
-        select(Comment)
-        .options(
-            selectinload(Comment.user),  # Load associated User
+@app.get("/threads/{thread_id}/comment-tree", response_model=Page[CommentNode])
+async def read_comment_tree(
+    thread_id: int,
+    parent_id: int | None = None,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    max_depth: int = Query(3, ge=1, le=10),
+    max_replies: int = Query(5, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_session),
+    loaders: Loaders = Depends(get_loaders),
+):
+    """
+    A page of `limit` comments (top-level ones, or replies to `parent_id`),
+    oldest first, each with up to `max_replies` replies per comment nested
+    `max_depth` levels deep. The whole tree is fetched with one recursive
+    query.
+    """
+    root_condition = (
+        Comment.parent_comment_id == parent_id
+        if parent_id is not None
+        else Comment.parent_comment_id.is_(None)
+    )
+    roots = select(
+        Comment.id,
+        Comment.parent_comment_id,
+        literal(1).label("depth"),
+        func.row_number().over(order_by=(Comment.created_at, Comment.id)).label("rn"),
+    ).where(Comment.thread_id == thread_id, root_condition)
+    if cursor:
+        created_at, id = decode_cursor(cursor)
+        roots = roots.where(
+            tuple_(Comment.created_at, Comment.id) > tuple_(created_at, id)
+        )
+    # One look-ahead row per level tells whether more comments exist
+    tree = (
+        roots.order_by(Comment.created_at, Comment.id)
+        .limit(limit + 1)
+        .cte("tree", recursive=True)
+    )
+    reply = aliased(Comment)
+    replies = (
+        select(
+            reply.id,
+            reply.parent_comment_id,
+            func.row_number().over(order_by=(reply.created_at, reply.id)).label("rn"),
+        )
+        .where(reply.parent_comment_id == tree.c.id)
+        .order_by(reply.created_at, reply.id)
+        .limit(max_replies + 1)
+        .lateral("replies")
+    )
+    # Look-ahead rows are not expanded further
+    level_limit = case((tree.c.depth == 1, limit), else_=max_replies)
+    tree = tree.union_all(
+        select(
+            replies.c.id,
+            replies.c.parent_comment_id,
+            tree.c.depth + 1,
+            replies.c.rn,
         )
-        .where(Comment.thread_id == thread_id)
-        .order_by(Comment.id.desc())
+        .select_from(tree.join(replies, true()))
+        .where(tree.c.depth < max_depth, tree.c.rn <= level_limit)
     )
-    view = []
-    votes = session.exec(select(Vote).where(Vote.comment_id is not None)).all()
-
-    for c in comments:
-        comment = CommentView(
-            id=c.id,
-            thread_id=c.thread_id,
-            content=c.content,
-            created_at=c.created_at,
-            parent_comment_id=c.parent_comment_id,
-            user=UserView(
-                id=c.user.id,
-                username=c.user.username,
-                email=c.user.email,
-                role=c.user.role,
-                organization=c.user.organization,
-            ),
-            vote=[v for v in votes if v.comment_id == c.id] if votes else [],
+
+    # Comments on the deepest level only report whether they have replies
+    child = aliased(Comment)
+    has_replies = case(
+        (
+            tree.c.depth == max_depth,
+            exists().where(child.parent_comment_id == tree.c.id),
+        ),
+        else_=False,
+    )
+    rows = (
+        await session.exec(
+            select(Comment, tree.c.depth, tree.c.rn, has_replies)
+            .join(tree, tree.c.id == Comment.id)
+            .order_by(tree.c.depth, Comment.created_at, Comment.id)
         )
-        view.append(comment)
+    ).all()
+
+    # Rows arrive level by level in sibling order, so one pass nests them
+    visible = [
+        (c, depth, more)
+        for c, depth, rn, more in rows
+        if rn <= (limit if depth == 1 else max_replies)
+    ]
+    views = await asyncio.gather(
+        *(build_comment_view(c, loaders) for c, _, _ in visible)
+    )
+    nodes = {}
+    items = []
+    for (c, depth, more), view in zip(visible, views):
+        node = CommentNode(**view.model_dump(), depth=depth, more_replies=more)
+        nodes[c.id] = node
+        if depth == 1:
+            items.append(node)
+        else:
+            nodes[c.parent_comment_id].replies.append(node)
 
-    return view
+    next_page = None
+    for c, depth, rn, _ in rows:
+        if depth == 1 and rn > limit:
+            last = items[-1]
+            next_page = encode_cursor(last.created_at, last.id)
+        elif depth > 1 and rn > max_replies:
+            parent = nodes[c.parent_comment_id]
+            last = parent.replies[-1]
+            parent.more_replies = True
+            parent.replies_cursor = encode_cursor(last.created_at, last.id)
+    return Page(items=items, next_cursor=next_page)
 
 
 @app.put("/comments/{comment_id}", response_model=Comment)
-def update_comment(
+async def update_comment(
     comment_id: int,
     comment: CommentCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    comment_to_update = session.exec(
-        select(Comment).where(Comment.id == comment_id, Comment.user_id == user.id)
+    comment_to_update = (
+        await session.exec(
+            select(Comment).where(Comment.id == comment_id, Comment.user_id == user.id)
+        )
     ).first()
     if not comment_to_update:
         raise HTTPException(
@@ -135,21 +272,23 @@ def update_comment(
             detail="Comment not found or you do not have permission to update it",
         )
 
+    # Replies are not re-parented; moving a comment could create a cycle
     comment_to_update.content = comment.content
-    comment_to_update.parent_id = comment.parent_id
-    session.commit()
-    session.refresh(comment_to_update)
+    await session.commit()
+    await session.refresh(comment_to_update)
     return comment_to_update
 
 
 @app.delete("/comments/{comment_id}", response_model=Comment)
-def delete_comment(
+async def delete_comment(
     comment_id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    comment_to_delete = session.exec(
-        select(Comment).where(Comment.id == comment_id, Comment.user_id == user.id)
+    comment_to_delete = (
+        await session.exec(
+            select(Comment).where(Comment.id == comment_id, Comment.user_id == user.id)
+        )
     ).first()
     if not comment_to_delete:
         raise HTTPException(
@@ -157,6 +296,6 @@ def delete_comment(
             detail="Comment not found or you do not have permission to delete it",
         )
 
-    session.delete(comment_to_delete)
-    session.commit()
+    await session.delete(comment_to_delete)
+    await session.commit()
     return comment_to_delete
@@ -1,236 +1,176 @@
-import base64
-import os
-import shutil
-from textwrap import dedent
-from fastapi import APIRouter, Depends, HTTPException, UploadFile
-from fastapi.responses import FileResponse
-from dotenv import load_dotenv
-
-from openai import OpenAI
-from sqlmodel import Session, select
-import trimesh
-from trimesh.exchange.stl import load_stl
-from trimesh.exchange.gltf import load_glb, load_gltf
 import logging
-import pyrender
-import numpy as np
-from PIL import Image
-import glob
-
-from app.main import get_session
-from app.models import Attachment
+import os
+from datetime import datetime
 
-load_dotenv()
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
+from app.jobs import JobQueue
+from app.main import engine, get_session
+from app.models import Attachment, MeshMetadata, RenderJob
+from app.render_cache import RenderCache, file_hash, render_cache_key
+from app.rendering import render_model, render_params
 
 app = APIRouter()
-client = OpenAI()
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s:%(lineno)s - %(levelname)s - %(message)s",
-)
 logger = logging.getLogger(__name__)
 
+# Renders run in their own processes; at most RENDER_WORKERS run at once and
+# the rest wait in the pool's queue
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))
+# Finished renders, keyed by mesh hash and render parameters
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", "renders")
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(1024**3)))
+render_cache = RenderCache(RENDER_CACHE_DIR, RENDER_CACHE_MAX_BYTES)
+
+
+class RenderJobView(BaseModel):
+    id: int
+    attachment_id: int
+    status: str
+    error: str | None = None
+    created_at: datetime
+    finished_at: datetime | None = None
+    result_url: str | None = None
+
+
+async def attachment_cache_key(attachment: Attachment) -> str:
+    """Render cache key of the attachment's mesh under the current parameters."""
+    if attachment.content_hash is None:
+        # Uploaded before attachments recorded their hash
+        content_hash = await run_in_threadpool(file_hash, attachment.file_url)
+    elif os.path.exists(attachment.file_url):
+        content_hash = attachment.content_hash
+    else:
+        raise FileNotFoundError(attachment.file_url)
+    return render_cache_key(content_hash, render_params())
+
+
+def render_job_view(job: RenderJob) -> RenderJobView:
+    return RenderJobView(
+        id=job.id,
+        attachment_id=job.attachment_id,
+        status=job.status,
+        error=job.error,
+        created_at=job.created_at,
+        finished_at=job.finished_at,
+        result_url=f"/render/jobs/{job.id}/result" if job.status == "done" else None,
+    )
+
 
-async def analyze_glb(file_path, file_type):
+async def run_render_job(job_id: int):
+    """Render a job claimed by this worker."""
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        job = await session.get(RenderJob, job_id)
+        if job is None:
+            # Deleted along with its attachment
+            return
+        attachment = await session.get(Attachment, job.attachment_id)
+        if attachment is None:
+            return
+
+    logger.info(f"Rendering {attachment.file_url} (job {job_id})")
     try:
-        if file_type.lower() == "glb":
-            mesh = trimesh.load(file_path, force="scene")
-        else:
-            mesh = trimesh.load_mesh(file_path)
+        image = await render_jobs.run_in_process(
+            render_model,
+            attachment.file_url,
+            attachment.file_type,
+        )
+        key = await attachment_cache_key(attachment)
+        # Writing may also scan and evict the cache directory
+        job.result_path = await run_in_threadpool(render_cache.put, key, image)
+        job.status = "done"
     except Exception as e:
-        logger.exception(f"Failed to load mesh")
-        return {"error": f"Failed to load mesh: {e}"}
-
-    # Check for mesh validity
-    if hasattr(mesh, "vertices") and (
-        np.isnan(mesh.vertices).any() or np.isinf(mesh.vertices).any()
-    ):
-        logger.error("Mesh contains NaN or infinite values in vertices.")
-        return {"error": "Mesh contains NaN or infinite values in vertices."}
-    if hasattr(mesh, "faces") and (len(mesh.faces) == 0):
-        logger.error("Mesh has no faces.")
-        return {"error": "Mesh has no faces."}
-    if hasattr(mesh, "is_watertight") and not mesh.is_watertight:
-        logger.warning("Mesh is not watertight. Proceeding, but rendering may fail.")
-
-    if isinstance(mesh, trimesh.Scene):
-        meshes = [g for g in mesh.dump()]
-        combined = trimesh.util.concatenate(meshes)
-    else:
-        combined = mesh
-
-    # Model center and size
-    center = combined.bounding_box.centroid
-    size = combined.bounding_box.extents
-    distance = max(size) * 2.5
-
-    os.makedirs("renders", exist_ok=True)
-    viewpoints = {
-        "front": (0, 10),
-        "back": (180, 10),
-        "left": (90, 10),
-        "right": (-90, 10),
-        "top": (0, 90),
-        "bottom": (0, -90),
-        "angled": (45, 30),
-    }
-
-    def get_camera_pose(azimuth_deg, elevation_deg, distance, center):
-        az = np.radians(azimuth_deg)
-        el = np.radians(elevation_deg)
-        x = distance * np.cos(el) * np.sin(az)
-        y = distance * np.sin(el)
-        z = distance * np.cos(el) * np.cos(az)
-        position = np.array([x, y, z]) + center
-
-        forward = center - position
-        forward /= np.linalg.norm(forward)
-
-        if abs(elevation_deg) == 90:
-            up = np.array([0, 0, 1 if elevation_deg > 0 else -1])
-        else:
-            up = np.array([0, 1, 0])
-
-        # Right-hand coordinate system
-        right = np.cross(forward, up)
-        if np.linalg.norm(right) < 1e-6:
-            right = np.array([1, 0, 0])  # fallback
-        else:
-            right /= np.linalg.norm(right)
-
-        true_up = np.cross(right, forward)
-
-        # Build 4x4 pose matrix
-        pose = np.eye(4)
-        pose[:3, 0] = right
-        pose[:3, 1] = true_up
-        pose[:3, 2] = -forward  # camera looks along -Z
-        pose[:3, 3] = position
-        return pose
-
-    renderer = pyrender.OffscreenRenderer(viewport_width=800, viewport_height=800)
-
-    for name, (az, el) in viewpoints.items():
-        scene = pyrender.Scene()
-        try:
-            mesh_to_add = pyrender.Mesh.from_trimesh(combined, smooth=False)
-            scene.add(mesh_to_add)
-        except Exception as e:
-            logger.error(f"Failed to add mesh to scene: {e}")
-            continue
-        camera = pyrender.PerspectiveCamera(yfov=np.pi / 3.0)
-        pose = get_camera_pose(az, el, distance, center)
-        if not np.isfinite(pose).all():
-            logger.error(f"Invalid pose matrix for view {name}: contains NaN or Inf.")
-            continue
-        scene.add(
-            camera, pose=pose
-        )  # Fails here numpy.linalg.LinAlgError: Eigenvalues did not converge
-        light = pyrender.DirectionalLight(color=np.ones(3), intensity=3.0)
-        scene.add(light, pose=pose)
-        try:
-            color, _ = renderer.render(scene)
-            Image.fromarray(color).save(f"renders/{name}.png")
-        except np.linalg.LinAlgError as e:
-            logger.error(f"Rendering failed for view {name}: {e}")
-            continue
-        except Exception as e:
-            logger.error(f"Unexpected error during rendering for view {name}: {e}")
-            continue
-    renderer.delete()
-    return {}
-
-
-@app.post("/render/{attachment_id}")
+        logger.exception(f"Render job {job_id} failed")
+        job.status = "failed"
+        job.error = str(e)
+    job.finished_at = datetime.utcnow()
+
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        session.add(job)
+        await session.commit()
+
+
+render_jobs = JobQueue(RenderJob, RenderJob.id, run_render_job, RENDER_WORKERS)
+
+
+@app.on_event("startup")
+async def resume_render_jobs():
+    """Pick up jobs that are queued, or whose worker stopped renewing them."""
+    await render_jobs.start()
+
+
+@app.on_event("shutdown")
+def shutdown_render_executor():
+    render_jobs.shutdown()
+
+
+@app.post("/render/{attachment_id}", status_code=202, response_model=RenderJobView)
 async def render(
     attachment_id: int,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
     """
-    Render a 3D model from the uploaded file using openai
+    Queue a render of the uploaded 3D model using the image model. Poll
+    /render/jobs/{job_id} for progress.
     """
-    attachment = session.exec(
-        select(Attachment).where(Attachment.id == attachment_id)
+    attachment = (
+        await session.exec(select(Attachment).where(Attachment.id == attachment_id))
     ).first()
+    if not attachment:
+        raise HTTPException(status_code=404, detail="Attachment not found")
 
-    logger.info(f"Analyzing {attachment.file_url}")
+    metadata = await session.get(MeshMetadata, attachment.id)
+    if metadata and metadata.errors and metadata.status == "done":
+        # Known bad mesh; don't spend a render worker finding out again
+        raise HTTPException(status_code=422, detail=metadata.errors[0])
 
-    # Creates images in renders folder
-    metadata = await analyze_glb(attachment.file_url, attachment.file_type)
-    if "error" in metadata:
-        raise HTTPException(status_code=500, detail=metadata["error"])
-
-    # Collect all rendered image paths
-    render_paths = sorted(glob.glob("renders/*.png"))
-
-    if not render_paths:
+    try:
+        key = await attachment_cache_key(attachment)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File does not exist")
+
+    cached_path = render_cache.get(key)
+    if cached_path:
+        # Same mesh rendered before: finish the job without rendering
+        job = RenderJob(
+            attachment_id=attachment.id,
+            status="done",
+            result_path=cached_path,
+            finished_at=datetime.utcnow(),
+        )
+        session.add(job)
+        await session.commit()
+        return render_job_view(job)
+
+    job = RenderJob(attachment_id=attachment.id)
+    session.add(job)
+    await session.commit()
+    render_jobs.enqueue(job.id)
+    return render_job_view(job)
+
+
+@app.get("/render/jobs/{job_id}", response_model=RenderJobView)
+async def read_render_job(job_id: int, session: AsyncSession = Depends(get_session)):
+    job = await session.get(RenderJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Render job not found")
+    return render_job_view(job)
+
+
+@app.get("/render/jobs/{job_id}/result")
+async def read_render_result(job_id: int, session: AsyncSession = Depends(get_session)):
+    job = await session.get(RenderJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Render job not found")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Render job is {job.status}")
+    if not os.path.exists(job.result_path):
         raise HTTPException(
-            status_code=500,
-            detail="No rendered images found. Ensure the model is valid and rendering was successful.",
+            status_code=410, detail="Render result was evicted, render again"
         )
 
-    # Upload images to OpenAI and collect file IDs
-    uploaded_file_ids = []
-    for path in render_paths:
-        with open(path, "rb") as img_file:
-            uploaded = client.files.create(file=img_file, purpose="user_data")
-            uploaded_file_ids.append(uploaded.id)
-
-    # Compose prompt for DALL·E
-    prompt = dedent("""
-        Given a complete set of reference images (front, back, left, right, top, bottom, and an angled perspective) of a 3D-model generate a high-quality, photorealistic render as if it were professionally photographed in a studio environment.
-
-        The final image should:
-        - Use realistic materials (e.g., matte composites, brushed metal, polycarbonate) with subtle lighting and shadows.
-
-        - Be composed with a clean background (e.g., gradient gray or studio white) and soft reflections to enhance depth.
-        
-        - Contain the entire model in the frame, ensuring all angles are visible and well-lit.
-
-        This render should visually communicate the object's readiness for real-world application, balancing aesthetics with realism and technical credibility.
-    """)
-
-    logger.info("Uploading images and generating render...")
-    response = client.responses.create(
-        model="gpt-4.1-mini",
-        input=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "input_text",
-                        "text": prompt,
-                    },
-                    *[
-                        {
-                            "type": "input_image",
-                            "file_id": file_id,
-                        }
-                        for file_id in uploaded_file_ids
-                    ],
-                ],
-            }
-        ],
-        tools=[{"type": "image_generation"}],
-    )
-    image_generation_calls = [
-        output for output in response.output if output.type == "image_generation_call"
-    ]
-    image_data = [output.result for output in image_generation_calls]
-
-    logger.info("Render generation completed.")
-    dir_path = "renders"
-    if os.path.exists(dir_path) and os.path.isdir(dir_path):
-        shutil.rmtree(dir_path)
-    if image_data:
-        image_base64 = image_data[0]
-        with open("final-render.png", "wb") as f:
-            f.write(base64.b64decode(image_base64))
-        return FileResponse(
-            "final-render.png",
-            media_type="image/png",
-            filename="render.png",
-        )
-    else:
-        print(response.output.content)
+    return FileResponse(job.result_path, media_type="image/png", filename="render.png")
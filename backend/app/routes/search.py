@@ -0,0 +1,175 @@
+import html
+import os
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from sqlalchemy import Float, func, literal, literal_column, tuple_, union_all
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.main import get_session
+from app.models import SEARCH_CONFIG, Comment, Thread
+from app.pagination import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    Page,
+    decode_keyset,
+    encode_keyset,
+)
+
+app = APIRouter()
+
+# Results are the top SEARCH_MAX_MATCHES threads and the top SEARCH_MAX_MATCHES
+# comments by rank; paging stops after them. Keeping only the top N bounds the
+# sort and the merge of the two kinds, though every match is still ranked
+SEARCH_MAX_MATCHES = int(os.getenv("SEARCH_MAX_MATCHES", "10000"))
+
+# ts_headline options for snippets; the whole title is returned highlighted
+SNIPPET_OPTIONS = (
+    "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10"
+)
+TITLE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, HighlightAll=true"
+
+thread_vector = Thread.__table__.c.search_vector
+comment_vector = Comment.__table__.c.search_vector
+
+
+class SearchResult(BaseModel):
+    type: str  # "thread" or "comment"
+    id: int
+    thread_id: int
+    # HTML-escaped, with matches wrapped in <mark>
+    title: str
+    snippet: str
+    rank: float
+    created_at: datetime
+
+
+def mark_safe(headline: str | None) -> str:
+    """Escape user text, keeping only the <mark> tags added by ts_headline."""
+    return (
+        html.escape(headline or "")
+        .replace("&lt;mark&gt;", "<mark>")
+        .replace("&lt;/mark&gt;", "</mark>")
+    )
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, str, int]:
+    try:
+        rank, kind, id = decode_keyset(cursor)
+        return float(rank), str(kind), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@app.get("/search", response_model=Page[SearchResult])
+async def search(
+    q: str = Query(..., min_length=1, max_length=256),
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Full-text search over thread titles, summaries and bodies and comment
+    bodies, best matches first. `q` takes web search syntax: "quoted
+    phrases", OR and -excluded words.
+    """
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+
+    # Matches come from the GIN indexes and the best SEARCH_MAX_MATCHES of each
+    # kind are kept, in a fixed order so pages are cut from the same set; only
+    # the page gets headlines
+    thread_rank = func.ts_rank(thread_vector, query).label("rank")
+    comment_rank = func.ts_rank(comment_vector, query).label("rank")
+    matches = union_all(
+        select(
+            literal_column("'thread'").label("kind"),
+            Thread.id.label("id"),
+            Thread.id.label("thread_id"),
+            Thread.created_at.label("created_at"),
+            thread_rank,
+        )
+        .where(thread_vector.op("@@")(query))
+        .order_by(thread_rank.desc(), Thread.id.desc())
+        .limit(SEARCH_MAX_MATCHES),
+        select(
+            literal_column("'comment'").label("kind"),
+            Comment.id.label("id"),
+            Comment.thread_id.label("thread_id"),
+            Comment.created_at.label("created_at"),
+            comment_rank,
+        )
+        .where(comment_vector.op("@@")(query))
+        .order_by(comment_rank.desc(), Comment.id.desc())
+        .limit(SEARCH_MAX_MATCHES),
+    ).subquery()
+
+    statement = select(matches)
+    if cursor:
+        rank, kind, id = decode_search_cursor(cursor)
+        statement = statement.where(
+            tuple_(matches.c.rank, matches.c.kind, matches.c.id)
+            < tuple_(literal(rank, Float), literal(kind), literal(id))
+        )
+    statement = statement.order_by(
+        matches.c.rank.desc(), matches.c.kind.desc(), matches.c.id.desc()
+    ).limit(limit + 1)
+    rows = (await session.exec(statement)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        del rows[limit:]
+        last = rows[-1]
+        next_cursor = encode_keyset([last.rank, last.kind, last.id])
+
+    thread_ids = [r.id for r in rows if r.kind == "thread"]
+    comment_ids = [r.id for r in rows if r.kind == "comment"]
+    headlines = {}
+    if thread_ids:
+        for id, title, snippet in (
+            await session.exec(
+                select(
+                    Thread.id,
+                    func.ts_headline(SEARCH_CONFIG, Thread.title, query, TITLE_OPTIONS),
+                    func.ts_headline(
+                        SEARCH_CONFIG,
+                        func.concat_ws(" ", Thread.summary, Thread.content),
+                        query,
+                        SNIPPET_OPTIONS,
+                    ),
+                ).where(Thread.id.in_(thread_ids))
+            )
+        ).all():
+            headlines[("thread", id)] = (title, snippet)
+    if comment_ids:
+        for id, title, snippet in (
+            await session.exec(
+                select(
+                    Comment.id,
+                    Thread.title,
+                    func.ts_headline(
+                        SEARCH_CONFIG, Comment.content, query, SNIPPET_OPTIONS
+                    ),
+                )
+                .join(Thread, Thread.id == Comment.thread_id)
+                .where(Comment.id.in_(comment_ids))
+            )
+        ).all():
+            headlines[("comment", id)] = (title, snippet)
+
+    items = []
+    for r in rows:
+        title, snippet = headlines.get((r.kind, r.id), ("", ""))
+        items.append(
+            SearchResult(
+                type=r.kind,
+                id=r.id,
+                thread_id=r.thread_id,
+                title=mark_safe(title),
+                snippet=mark_safe(snippet),
+                rank=r.rank,
+                created_at=r.created_at,
+            )
+        )
+    return Page(items=items, next_cursor=next_cursor)
@@ -1,201 +1,460 @@
+import asyncio
 from datetime import datetime
-import uuid
+import logging
 
 from fastapi.responses import FileResponse
-from app.main import get_current_user, get_session
-from app.models import Attachment, Thread, User, Vote
-from fastapi import Depends, Form, UploadFile
-from sqlmodel import Session, select
+from app.http_cache import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    http_date,
+    is_not_modified,
+    not_modified,
+)
+from app.loaders import Loaders, get_loaders
+from app.main import engine, get_current_user, get_session
+from app.mesh import MESH_FILE_TYPES
+from app.models import Attachment, MeshMetadata, TagCount, Thread, User, Vote
+from fastapi import Depends, Form, Query, Request, UploadFile
+from sqlalchemy.dialects.postgresql import array, insert
+from sqlmodel import and_, or_, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
+from app.response_cache import (
+    LATEST_THREADS,
+    cache_key,
+    response_cache,
+    send_cached,
+    serialize,
+)
+from app.routes.attachment import mesh_jobs
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, Page, next_cursor, paginate
 from app.routes.user import UserView
+from app.storage import blob_store
+from starlette.concurrency import run_in_threadpool
 import os
 
 app = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Blobs untouched for STORAGE_GC_GRACE seconds with no Attachment referring to
+# them are removed every STORAGE_GC_INTERVAL seconds
+STORAGE_GC_INTERVAL = float(os.getenv("STORAGE_GC_INTERVAL", "3600"))
+STORAGE_GC_GRACE = float(os.getenv("STORAGE_GC_GRACE", "3600"))
+_blob_gc_task: asyncio.Task | None = None
 
 
 class AttachmentSimpleView(BaseModel):
     id: int
     file_url: str = None
     file_type: str = None
+    thumbnail_url: str | None = None
 
 
 class ThreadCreate(BaseModel):
     title: str
     content: str
+    category: str | None = None
+    # Left unchanged on update when omitted
+    tags: list[str] | None = None
+
+
+class TagCountView(BaseModel):
+    tag: str
+    count: int
+
+
+def listing_tags(thread: Thread) -> list[str]:
+    """Cache tags of the filtered listings a thread appears in."""
+    tags = []
+    if thread.category is not None:
+        tags.append(f"category:{thread.category}")
+    tags.extend(f"tag:{tag}" for tag in thread.tags or [])
+    return tags
+
+
+def normalize_tags(tags: list[str]) -> list[str]:
+    """Lowercase, trim and de-duplicate tags, keeping their order."""
+    return list(dict.fromkeys(t.strip().lower() for t in tags if t.strip()))
+
+
+async def update_tag_counts(
+    session: AsyncSession, old_tags: list[str] | None, new_tags: list[str] | None
+):
+    """Apply a thread's tag change to the TagCount aggregate."""
+    old, new = set(old_tags or []), set(new_tags or [])
+    deltas = {tag: 1 for tag in new - old} | {tag: -1 for tag in old - new}
+    if not deltas:
+        return
+    # Sorted so concurrent writers lock the rows in the same order
+    statement = insert(TagCount).values(
+        [{"tag": tag, "count": delta} for tag, delta in sorted(deltas.items())]
+    )
+    await session.exec(
+        statement.on_conflict_do_update(
+            index_elements=[TagCount.tag],
+            set_={"count": TagCount.count + statement.excluded.count},
+        )
+    )
 
 
 class ThreadView(BaseModel):
     id: int
     title: str
     content: str
+    category: str | None = None
+    tags: list[str] = []
     created_at: datetime
     updated_at: datetime
     user: UserView
-    vote: list[Vote]
+    score: int = 0
+    upvotes: int = 0
+    downvotes: int = 0
+    vote: list[Vote] = []  # the viewer's own vote, if any
     attachment: AttachmentSimpleView | None = None
 
 
 @app.post("/thread", response_model=Thread)
-def create_thread(
+async def create_thread(
     thread: ThreadCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
+    tags = normalize_tags(thread.tags or [])
     thread = Thread(
         title=thread.title,
         content=thread.content,
+        category=thread.category,
+        tags=tags,
         user_id=user.id,  # Assuming get_current_user() returns the current user
     )
     session.add(thread)
-    session.commit()
-    session.refresh(thread)
+    await update_tag_counts(session, [], tags)
+    await session.commit()
+    await session.refresh(thread)
+    response_cache.invalidate(LATEST_THREADS, *listing_tags(thread))
     return thread
 
 
-@app.get("/threads", response_model=list[ThreadView])
-def read_threads(
-    page: int = 0, limit: int = 10, session: Session = Depends(get_session)
-):
-    threads = session.exec(
-        select(Thread, User, Attachment)
-        .join(User, Thread.user_id == User.id)
-        .join(Attachment, Attachment.thread_id == Thread.id, isouter=True)
-        .order_by(Thread.created_at.desc())
-        .offset(page * 10)
-        .limit(limit)
+async def build_thread_view(t: Thread, loaders: Loaders) -> ThreadView:
+    u, a, votes = await asyncio.gather(
+        loaders.users.load(t.user_id),
+        loaders.thread_attachments.load(t.id),
+        loaders.thread_votes.load(t.id),
     )
-    view = []
-    thread_votes = session.exec(select(Vote).where(Vote.thread_id is not None)).all()
-    for t, u, a in threads:
-        thread = ThreadView(
-            id=t.id,
-            title=t.title,
-            content=t.content,
-            created_at=t.created_at,
-            updated_at=t.updated_at,
-            user=UserView(id=u.id, username=u.username, email=u.email, role=u.role),
-            vote=[v for v in thread_votes if v.thread_id == t.id],
-            attachment=AttachmentSimpleView(
-                id=a.id, file_url=a.file_url, file_type=a.file_type
-            )
-            if a and a.file_url and a.file_type
-            else None,
-        )
-        view.append(thread)
-    return view
-
-
-@app.get("/threads/{thread_id}", response_model=ThreadView)
-def read_thread(thread_id: int, session: Session = Depends(get_session)):
-    result = session.exec(
-        select(Thread, User, Attachment)
-        .join(User, Thread.user_id == User.id)
-        .join(Attachment, Attachment.thread_id == Thread.id, isouter=True)
-        .where(Thread.id == thread_id)
-    ).first()
-
-    if not result:
-        raise HTTPException(status_code=404)
-    thread_votes = session.exec(select(Vote).where(Vote.thread_id is not None)).all()
-
-    t, u, a = result
-    thread = ThreadView(
+    return ThreadView(
         id=t.id,
         title=t.title,
         content=t.content,
+        category=t.category,
+        tags=t.tags or [],
         created_at=t.created_at,
         updated_at=t.updated_at,
         user=UserView(id=u.id, username=u.username, email=u.email, role=u.role),
-        vote=[v for v in thread_votes if v.thread_id == t.id],
+        score=t.score,
+        upvotes=t.upvotes,
+        downvotes=t.downvotes,
+        vote=votes,
         attachment=AttachmentSimpleView(
-            id=a.id, file_url=a.file_url, file_type=a.file_type
+            id=a.id,
+            file_url=a.file_url,
+            file_type=a.file_type,
+            thumbnail_url=f"/attachments/{a.id}/thumbnail"
+            if a.thumbnail_path
+            else None,
         )
         if a and a.file_url and a.file_type
         else None,
     )
-    return thread
+
+
+@app.get("/threads", response_model=Page[ThreadView])
+async def read_threads(
+    request: Request,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    tag: list[str] = Query([]),
+    tag_mode: str = Query("any", pattern="^(any|all)$"),
+    category: str | None = None,
+    session: AsyncSession = Depends(get_session),
+    loaders: Loaders = Depends(get_loaders),
+):
+    """
+    Newest threads first. `tag` may be repeated; with tag_mode=any a thread
+    needs one of the tags, with tag_mode=all every one of them.
+    """
+    # Anonymous pages are shared, so they are served from the response cache
+    shared = loaders.viewer is None
+    key = cache_key(request)
+    if shared and (cached := response_cache.get(key)) is not None:
+        return send_cached(request, cached, shared)
+    generation = response_cache.generation
+
+    statement = select(Thread)
+    tags = normalize_tags(tag)
+    if tags:
+        # Both operators are served by the GIN index on tags
+        statement = statement.where(
+            Thread.tags.has_any(array(tags))
+            if tag_mode == "any"
+            else Thread.tags.contains(tags)
+        )
+    if category is not None:
+        statement = statement.where(Thread.category == category)
+    threads = (await session.exec(paginate(statement, Thread, cursor, limit))).all()
+    # Other pages only change when one of their threads does; filtered pages
+    # also when a thread is added to or moved into the filter
+    cache_tags = [f"thread:{t.id}" for t in threads[:limit]]
+    if category is not None:
+        cache_tags.append(f"category:{category}")
+    cache_tags.extend(f"tag:{t}" for t in tags)
+    if cursor is None and category is None and not tags:
+        cache_tags.append(LATEST_THREADS)
+
+    cursor = next_cursor(threads, limit)
+    view = await asyncio.gather(*(build_thread_view(t, loaders) for t in threads))
+    cached = serialize(Page[ThreadView](items=view, next_cursor=cursor))
+    if shared:
+        response_cache.set(key, cached, cache_tags, generation)
+    return send_cached(request, cached, shared)
+
+
+@app.get("/threads/{thread_id}", response_model=ThreadView)
+async def read_thread(
+    thread_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    loaders: Loaders = Depends(get_loaders),
+):
+    shared = loaders.viewer is None
+    key = cache_key(request)
+    if shared and (cached := response_cache.get(key)) is not None:
+        return send_cached(request, cached, shared)
+    generation = response_cache.generation
+
+    thread = (await session.exec(select(Thread).where(Thread.id == thread_id))).first()
+    if not thread:
+        raise HTTPException(status_code=404)
+    cached = serialize(await build_thread_view(thread, loaders))
+    if shared:
+        response_cache.set(key, cached, [f"thread:{thread_id}"], generation)
+    return send_cached(request, cached, shared)
 
 
 @app.put("/threads/{thread_id}", response_model=Thread)
-def update_thread(
-    thread_id: int, thread: ThreadCreate, session: Session = Depends(get_session)
+async def update_thread(
+    thread_id: int,
+    thread: ThreadCreate,
+    session: AsyncSession = Depends(get_session),
 ):
-    thread_to_update = session.exec(
-        select(Thread).where(Thread.id == thread_id)
+    # Locked so concurrent updates see each other's tags
+    thread_to_update = (
+        await session.exec(
+            select(Thread).where(Thread.id == thread_id).with_for_update()
+        )
     ).first()
     if not thread_to_update:
         raise HTTPException(status_code=404, detail="Thread not found")
 
+    old_listing_tags = listing_tags(thread_to_update)
     thread_to_update.title = thread.title
     thread_to_update.content = thread.content
+    if thread.category is not None:
+        thread_to_update.category = thread.category
+    if thread.tags is not None:
+        tags = normalize_tags(thread.tags)
+        await update_tag_counts(session, thread_to_update.tags, tags)
+        thread_to_update.tags = tags
     thread_to_update.updated_at = (
         datetime.utcnow()
     )  # Assuming you have an updated_at field
-    session.commit()
-    session.refresh(thread_to_update)
+    await session.commit()
+    await session.refresh(thread_to_update)
+    # Its old and new category and tags decide which filtered listings it
+    # leaves or joins
+    response_cache.invalidate(
+        f"thread:{thread_id}",
+        *old_listing_tags,
+        *listing_tags(thread_to_update),
+    )
     return thread_to_update
 
 
 @app.delete("/threads/{thread_id}", response_model=Thread)
-def delete_thread(thread_id: int, session: Session = Depends(get_session)):
-    thread_to_delete = session.exec(
-        select(Thread).where(Thread.id == thread_id)
+async def delete_thread(thread_id: int, session: AsyncSession = Depends(get_session)):
+    thread_to_delete = (
+        await session.exec(
+            select(Thread).where(Thread.id == thread_id).with_for_update()
+        )
     ).first()
     if not thread_to_delete:
         raise HTTPException(status_code=404, detail="Thread not found")
 
-    session.delete(thread_to_delete)
-    session.commit()
+    await update_tag_counts(session, thread_to_delete.tags, [])
+    await session.delete(thread_to_delete)
+    await session.commit()
+    response_cache.invalidate(f"thread:{thread_id}")
     return thread_to_delete
 
 
+@app.get("/tags", response_model=list[TagCountView])
+async def read_tags(
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=1000),
+    session: AsyncSession = Depends(get_session),
+):
+    """Tags in use, most used first."""
+    tag_counts = (
+        await session.exec(
+            select(TagCount)
+            .where(TagCount.count > 0)
+            .order_by(TagCount.count.desc(), TagCount.tag)
+            .limit(limit)
+        )
+    ).all()
+    return [TagCountView(tag=t.tag, count=t.count) for t in tag_counts]
+
+
 class AttachmentView(BaseModel):
     id: int
     thread_id: int
     file_url: str
     file_type: str
+    content_hash: str | None = None
+    size: int | None = None
 
 
 @app.post("/file/upload")
 async def upload_file(
     file: UploadFile,
     thread_id: int = Form(...),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
-    tmp_dir = "/tmp"
-    os.makedirs(tmp_dir, exist_ok=True)
-    file_path = os.path.join(tmp_dir, file.filename)
-    with open(file_path, "wb") as f:
-        file_bytes = await file.read()
-        f.write(file_bytes)
+    # The row is only recorded once the blob is safely on disk
+    content_hash, size, file_path = await blob_store.save(file)
     attachment = Attachment(
         thread_id=thread_id,
         file_url=file_path,
         file_type=file.filename.split(".")[-1],
+        content_hash=content_hash,
+        size=size,
     )
     session.add(attachment)
-    session.commit()
+    is_mesh = attachment.file_type.lower() in MESH_FILE_TYPES
+    if is_mesh:
+        await session.flush()
+        session.add(MeshMetadata(attachment_id=attachment.id))
+    await session.commit()
+    response_cache.invalidate(f"thread:{thread_id}")
+    if is_mesh:
+        mesh_jobs.enqueue(attachment.id)
     return AttachmentView(
         id=attachment.id,
         thread_id=attachment.thread_id,
         file_url=file_path,
-        file_type=file.filename.split(".")[-1],
+        file_type=attachment.file_type,
+        content_hash=content_hash,
+        size=size,
     )
 
 
 @app.get("/file/{file_name}")
-async def get_file(file_name: str, session: Session = Depends(get_session)):
-    attachment = session.exec(
-        select(Attachment).where(Attachment.file_url == f"/tmp/{file_name}")
+async def get_file(
+    file_name: str,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+):
+    """
+    Serve an attachment. Supports Range requests and conditional requests on
+    its ETag or modification time; blobs are cached as immutable.
+    """
+    # Stored blobs are fetched as <content hash>.<ext>; older uploads by their
+    # name under /tmp
+    content_hash = file_name.split(".")[0]
+    attachment = (
+        await session.exec(
+            select(Attachment)
+            .where(
+                or_(
+                    and_(
+                        Attachment.content_hash == content_hash,
+                        Attachment.file_url == blob_store.path(content_hash),
+                    ),
+                    Attachment.file_url == f"/tmp/{file_name}",
+                )
+            )
+            .limit(1)
+        )
     ).first()
     if not attachment:
         raise HTTPException(status_code=404, detail="File not found")
 
-    if not os.path.exists(attachment.file_url):
+    try:
+        stat = os.stat(attachment.file_url)
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File does not exist")
 
+    if attachment.file_url == blob_store.path(content_hash):
+        # The content hash is a strong validator, and the URL can never point
+        # at different bytes
+        headers = {
+            "ETag": f'"{content_hash}"',
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        }
+    else:
+        # Files under /tmp can be overwritten; FileResponse derives a
+        # validator from mtime and size
+        headers = {"Cache-Control": REVALIDATE_CACHE_CONTROL}
+    headers["Last-Modified"] = http_date(stat.st_mtime)
+
+    if is_not_modified(request, headers.get("ETag"), stat.st_mtime):
+        return not_modified(headers)
+
     return FileResponse(
-        attachment.file_url, filename=attachment.file_url.split("/")[-1]
+        attachment.file_url, filename=file_name, headers=headers, stat_result=stat
     )
+
+
+async def collect_garbage() -> int:
+    """Remove stale blobs that no Attachment refers to. Returns how many."""
+    content_hashes = await run_in_threadpool(blob_store.stale_blobs, STORAGE_GC_GRACE)
+    removed = 0
+    async with AsyncSession(engine) as session:
+        for i in range(0, len(content_hashes), 1000):
+            batch = content_hashes[i : i + 1000]
+            referenced = set(
+                (
+                    await session.exec(
+                        select(Attachment.content_hash)
+                        .where(Attachment.content_hash.in_(batch))
+                        .distinct()
+                    )
+                ).all()
+            )
+            orphans = [h for h in batch if h not in referenced]
+            await run_in_threadpool(blob_store.remove, orphans, STORAGE_GC_GRACE)
+            removed += len(orphans)
+    return removed
+
+
+async def blob_gc_loop():
+    while True:
+        await asyncio.sleep(STORAGE_GC_INTERVAL)
+        try:
+            removed = await collect_garbage()
+            if removed:
+                logger.info(f"Garbage collected {removed} blobs")
+        except Exception:
+            logger.exception("Blob garbage collection failed")
+
+
+@app.on_event("startup")
+async def start_blob_gc():
+    global _blob_gc_task
+    _blob_gc_task = asyncio.create_task(blob_gc_loop())
+
+
+@app.on_event("shutdown")
+async def stop_blob_gc():
+    if _blob_gc_task is not None:
+        _blob_gc_task.cancel()
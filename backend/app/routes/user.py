@@ -1,8 +1,9 @@
 from pydantic import BaseModel
-from app.main import get_session
+from app.main import get_session, user_cache
 from app.models import User
 from fastapi import Depends
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import APIRouter, HTTPException
 
 app = APIRouter()
@@ -21,8 +22,10 @@ class UserUpdate(BaseModel):
 
 
 @app.get("/users")
-def read_users(skip: int = 0, limit: int = 10, session: Session = Depends(get_session)):
-    users = session.exec(select(User).offset(skip).limit(limit)).all()
+async def read_users(
+    skip: int = 0, limit: int = 10, session: AsyncSession = Depends(get_session)
+):
+    users = (await session.exec(select(User).offset(skip).limit(limit))).all()
     return [
         {
             "id": str(u.id),
@@ -35,8 +38,8 @@ def read_users(skip: int = 0, limit: int = 10, session: Session = Depends(get_se
 
 
 @app.get("/users/{user_id}")
-def read_user(user_id: int, session: Session = Depends(get_session)):
-    user = session.exec(select(User).where(User.id == user_id)).first()
+async def read_user(user_id: int, session: AsyncSession = Depends(get_session)):
+    user = (await session.exec(select(User).where(User.id == user_id))).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -50,10 +53,12 @@ def read_user(user_id: int, session: Session = Depends(get_session)):
 
 
 @app.put("/users/{user_id}", response_model=UserView)
-def update_user_organization(
-    user_id: int, user_update: UserUpdate, session: Session = Depends(get_session)
+async def update_user_organization(
+    user_id: int, user_update: UserUpdate, session: AsyncSession = Depends(get_session)
 ):
-    user_to_update = session.exec(select(User).where(User.id == user_id)).first()
+    user_to_update = (
+        await session.exec(select(User).where(User.id == user_id))
+    ).first()
     if not user_to_update:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -62,8 +67,9 @@ def update_user_organization(
     )
 
     session.add(user_to_update)
-    session.commit()
-    session.refresh(user_to_update)
+    await session.commit()
+    await session.refresh(user_to_update)
+    user_cache.invalidate(user_id)
 
     return {
         "id": str(user_to_update.id),
@@ -75,11 +81,14 @@ def update_user_organization(
 
 
 @app.delete("/users/{user_id}")
-def delete_user(user_id: int, session: Session = Depends(get_session)):
-    user_to_delete = session.exec(select(User).where(User.id == user_id)).first()
+async def delete_user(user_id: int, session: AsyncSession = Depends(get_session)):
+    user_to_delete = (
+        await session.exec(select(User).where(User.id == user_id))
+    ).first()
     if not user_to_delete:
         raise HTTPException(status_code=404, detail="User not found")
 
-    session.delete(user_to_delete)
-    session.commit()
+    await session.delete(user_to_delete)
+    await session.commit()
+    user_cache.invalidate(user_id)
     return {"detail": "User deleted successfully"}
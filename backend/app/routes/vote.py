@@ -1,12 +1,34 @@
+import asyncio
+import logging
 from typing import Optional
-from app.main import get_current_user, get_session
-from app.models import User, Vote
-from fastapi import Depends
+from app.main import engine, get_current_user, get_session
+from app.models import Comment, Thread, User, Vote
+from app.response_cache import response_cache
+from app.vote_buffer import (
+    VOTE_FLUSH_BATCH_SIZE,
+    VOTE_FLUSH_INTERVAL,
+    VOTE_MAX_STALENESS,
+    VoteBuffer,
+    apply_buffered_votes,
+)
+from fastapi import Depends, HTTPException, Response
 from pydantic import BaseModel
-from sqlmodel import Session, select
+from sqlalchemy import Integer, cast, exists, func, literal, select as sa_select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 from fastapi import APIRouter
 
 app = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Votes accepted by one PUT /votes request
+MAX_VOTE_BATCH = 100
+
+vote_buffer = VoteBuffer()
+_vote_flush_task: asyncio.Task | None = None
+_vote_flush_stop = asyncio.Event()
 
 
 class VoteCreate(BaseModel):
@@ -15,57 +37,241 @@ class VoteCreate(BaseModel):
     vote_type: str
 
 
+class VoteResult(BaseModel):
+    thread_id: Optional[int] = None
+    comment_id: Optional[int] = None
+    value: int  # the user's vote after the request; 0 if it was removed
+    score: int
+    upvotes: int
+    downvotes: int
+
+
 vote_type_map = {"upvote": 1, "downvote": -1}
 
 
-@app.put("/vote", response_model=Vote)
-def update_vote(
+def vote_target(vote_create: VoteCreate):
+    """(counter model, Vote foreign key column, target id) of a vote."""
+    if (vote_create.thread_id is None) == (vote_create.comment_id is None):
+        raise HTTPException(
+            status_code=400, detail="Exactly one of thread_id or comment_id is required"
+        )
+    if vote_create.vote_type not in vote_type_map:
+        raise HTTPException(status_code=400, detail="Invalid vote type")
+    if vote_create.thread_id is not None:
+        return Thread, Vote.thread_id, vote_create.thread_id
+    return Comment, Vote.comment_id, vote_create.comment_id
+
+
+def vote_statement(user_id: int, vote_create: VoteCreate):
+    """
+    Toggle a vote and adjust the target's counters in one statement:
+    voting the same way again removes the vote, voting the other way flips
+    it. Returns the new counters and the user's resulting vote.
+    """
+    model, column, target_id = vote_target(vote_create)
+    value = vote_type_map[vote_create.vote_type]
+
+    # Locking the user's existing vote serializes concurrent clicks
+    prev = (
+        select(Vote.id, Vote.value)
+        .where(Vote.user_id == user_id, column == target_id)
+        .with_for_update()
+        .cte("prev")
+    )
+    removed = (
+        delete(Vote)
+        .where(Vote.id.in_(sa_select(prev.c.id).where(prev.c.value == value)))
+        .returning(Vote.value)
+        .cte("removed")
+    )
+    changed = (
+        update(Vote)
+        .where(Vote.id.in_(sa_select(prev.c.id).where(prev.c.value != value)))
+        .values(value=value)
+        .returning(Vote.value)
+        .cte("changed")
+    )
+    # A concurrent first vote wins the unique index; this one then does nothing
+    added = (
+        insert(Vote)
+        .from_select(
+            ["user_id", column.name, "value"],
+            sa_select(literal(user_id), literal(target_id), literal(value)).where(
+                ~exists(sa_select(prev.c.id))
+            ),
+        )
+        .on_conflict_do_nothing(
+            index_elements=["user_id", column.name],
+            index_where=column.isnot(None),
+        )
+        .returning(Vote.value)
+        .cte("added")
+    )
+    # Whichever branch ran decides the new value; none did if the vote was
+    # removed or lost the insert race
+    delta = sa_select(
+        func.coalesce(sa_select(prev.c.value).scalar_subquery(), 0).label("old"),
+        func.coalesce(
+            sa_select(changed.c.value).scalar_subquery(),
+            sa_select(added.c.value).scalar_subquery(),
+            0,
+        ).label("new"),
+    ).subquery("delta")
+    return (
+        update(model)
+        .add_cte(removed)
+        .where(model.id == target_id)
+        .values(
+            score=model.score + delta.c.new - delta.c.old,
+            upvotes=model.upvotes
+            + cast(delta.c.new == 1, Integer)
+            - cast(delta.c.old == 1, Integer),
+            downvotes=model.downvotes
+            + cast(delta.c.new == -1, Integer)
+            - cast(delta.c.old == -1, Integer),
+        )
+        .returning(model.score, model.upvotes, model.downvotes, delta.c.new)
+    )
+
+
+async def apply_vote(
+    session: AsyncSession, user_id: int, vote_create: VoteCreate
+) -> VoteResult:
+    row = (await session.exec(vote_statement(user_id, vote_create))).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Vote target not found")
+    score, upvotes, downvotes, value = row
+    return VoteResult(
+        thread_id=vote_create.thread_id,
+        comment_id=vote_create.comment_id,
+        value=value,
+        score=score,
+        upvotes=upvotes,
+        downvotes=downvotes,
+    )
+
+
+def invalidate_threads(thread_ids):
+    """Drop cached views of threads whose counters changed."""
+    tags = {f"thread:{id}" for id in thread_ids}
+    if tags:
+        response_cache.invalidate(*tags)
+
+
+def buffer_votes(user_id: int, votes: list[VoteCreate]) -> Response:
+    """Queue votes for the next flush. Counters catch up within a flush."""
+    if vote_buffer.staleness() > VOTE_MAX_STALENESS:
+        raise HTTPException(status_code=503, detail="Votes are not being saved")
+    targets = [vote_target(vote_create) for vote_create in votes]
+    for vote_create, (_, column, target_id) in zip(votes, targets):
+        vote_buffer.add(
+            user_id, column.name, target_id, vote_type_map[vote_create.vote_type]
+        )
+    return Response(status_code=202)
+
+
+async def flush_vote_buffer() -> int:
+    """Write all buffered votes. Returns how many (user, target) were flushed."""
+    pending, since = vote_buffer.take()
+    keys = list(pending)
+    for i in range(0, len(keys), VOTE_FLUSH_BATCH_SIZE):
+        batch = {key: pending[key] for key in keys[i : i + VOTE_FLUSH_BATCH_SIZE]}
+        try:
+            async with AsyncSession(engine) as session:
+                await apply_buffered_votes(session, batch)
+                await session.commit()
+        except BaseException:
+            # Retry the unwritten votes on the next flush, also when cancelled
+            vote_buffer.restore({key: pending[key] for key in keys[i:]}, since)
+            raise
+        invalidate_threads(t for _, c, t in batch if c == "thread_id")
+    return len(keys)
+
+
+async def vote_flush_loop():
+    while not _vote_flush_stop.is_set():
+        try:
+            await asyncio.wait_for(_vote_flush_stop.wait(), VOTE_FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await flush_vote_buffer()
+        except Exception:
+            logger.exception("Flushing buffered votes failed")
+
+
+@app.on_event("startup")
+async def start_vote_flush():
+    global _vote_flush_task
+    if VOTE_FLUSH_INTERVAL > 0:
+        _vote_flush_task = asyncio.create_task(vote_flush_loop())
+
+
+@app.on_event("shutdown")
+async def stop_vote_flush():
+    if _vote_flush_task is None:
+        return
+    # Let a flush in progress finish; the loop then flushes once more and exits
+    _vote_flush_stop.set()
+    await _vote_flush_task
+    try:
+        flushed = await flush_vote_buffer()
+        if flushed:
+            logger.info(f"Flushed {flushed} buffered votes on shutdown")
+    except Exception:
+        logger.exception(f"Lost {len(vote_buffer)} buffered votes on shutdown")
+
+
+@app.put("/vote", response_model=VoteResult)
+async def update_vote(
     vote_create: VoteCreate,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     user: User = Depends(get_current_user),
 ):
-    if not vote_create.thread_id and not vote_create.comment_id:
-        raise ValueError("Either thread_id or comment_id must be provided")
-    if vote_create.thread_id:
-        existing_vote = session.exec(
-            select(Vote).where(
-                Vote.user_id == user.id, Vote.thread_id == vote_create.thread_id
-            )
-        ).first()
-    if vote_create.comment_id:
-        existing_vote = session.exec(
-            select(Vote).where(
-                Vote.user_id == user.id, Vote.comment_id == vote_create.comment_id
-            )
-        ).first()
-
-    if existing_vote:
-        if existing_vote.value == vote_type_map[vote_create.vote_type]:
-            # If the same vote type is submitted, remove the vote
-            session.delete(existing_vote)
-            session.commit()
-            return {"message": "Vote removed"}
-        else:
-            # Update the existing vote to the new type
-            existing_vote.value = vote_type_map[vote_create.vote_type]
-            session.commit()
-            session.refresh(existing_vote)
-            return existing_vote
-
-    # Create a new vote if no existing vote found
-    if vote_create.thread_id:
-        new_vote = Vote(
-            user_id=user.id,
-            thread_id=vote_create.thread_id,
-            value=vote_type_map[vote_create.vote_type],
-        )
-    if vote_create.comment_id:
-        new_vote = Vote(
-            user_id=user.id,
-            comment_id=vote_create.comment_id,
-            value=vote_type_map[vote_create.vote_type],
+    """
+    Toggle a vote and return the new counters. With write-behind enabled
+    (VOTE_FLUSH_INTERVAL) the vote is queued instead and 202 is returned.
+    """
+    if VOTE_FLUSH_INTERVAL > 0:
+        return buffer_votes(user.id, [vote_create])
+    try:
+        result = await apply_vote(session, user.id, vote_create)
+        await session.commit()
+    except IntegrityError:
+        # The target was deleted while voting
+        raise HTTPException(status_code=404, detail="Vote target not found")
+    invalidate_threads([vote_create.thread_id] if vote_create.thread_id else [])
+    return result
+
+
+@app.put("/votes", response_model=list[VoteResult])
+async def update_votes(
+    votes: list[VoteCreate],
+    session: AsyncSession = Depends(get_session),
+    user: User = Depends(get_current_user),
+):
+    """
+    Apply several votes in one transaction. Votes on the same target apply
+    in request order; results are returned in request order.
+    """
+    if len(votes) > MAX_VOTE_BATCH:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_VOTE_BATCH} votes per request"
         )
-    session.add(new_vote)
-    session.commit()
-    session.refresh(new_vote)
-    return new_vote
+    if VOTE_FLUSH_INTERVAL > 0:
+        return buffer_votes(user.id, votes)
+    targets = [vote_target(vote_create) for vote_create in votes]
+    # Locking targets in a fixed order keeps concurrent batches from deadlocking
+    order = sorted(
+        range(len(votes)),
+        key=lambda i: (targets[i][0].__tablename__, targets[i][2]),
+    )
+    results: list[VoteResult | None] = [None] * len(votes)
+    try:
+        for i in order:
+            results[i] = await apply_vote(session, user.id, votes[i])
+        await session.commit()
+    except IntegrityError:
+        raise HTTPException(status_code=404, detail="Vote target not found")
+    invalidate_threads(v.thread_id for v in votes if v.thread_id)
+    return results
@@ -0,0 +1,208 @@
+import fcntl
+import glob
+import hashlib
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+
+logger = logging.getLogger(__name__)
+
+# Attachment blobs, stored by content hash
+STORAGE_DIR = os.getenv("STORAGE_DIR", "attachments")
+
+# Uploads are streamed to disk in chunks of this many bytes, so memory use per
+# upload stays constant no matter how large the file is
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024**2)))
+# Larger uploads are rejected with 413: up front when they declare their
+# Content-Length, otherwise as soon as the received bytes cross the limit
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(512 * 1024**2)))
+# Room in a request body for the multipart framing and form fields around a file
+MAX_REQUEST_OVERHEAD = 1024**2
+
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject request bodies over `max_bytes` while they arrive. Starlette spools
+    multipart bodies to disk before the endpoint runs, so the check in
+    stream_upload alone would only fire once the whole body was received.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES + MAX_REQUEST_OVERHEAD):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse({"detail": "File too large"}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail="File too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _write_chunk(f, digest, chunk: bytes):
+    f.write(chunk)
+    digest.update(chunk)
+
+
+def _sync_and_close(f):
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+
+
+async def stream_upload(
+    file: UploadFile, path: str, max_bytes: int = MAX_UPLOAD_BYTES
+) -> tuple[str, int]:
+    """
+    Stream an upload to `path`, hashing it on the way. The data is written to
+    a temporary file next to `path`, fsynced and only then moved into place.
+    Returns the sha256 hex digest and the size in bytes.
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    tmp_path = f"{path}.part"
+    digest = hashlib.sha256()
+    size = 0
+    f = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                raise HTTPException(status_code=413, detail="File too large")
+            await run_in_threadpool(_write_chunk, f, digest, chunk)
+        await run_in_threadpool(_sync_and_close, f)
+        await run_in_threadpool(os.replace, tmp_path, path)
+    except BaseException:
+        f.close()
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return digest.hexdigest(), size
+
+
+class BlobStore:
+    """
+    Content-addressed file storage. Each unique file is stored once, as
+    <directory>/ab/cd/abcd... named by its sha256, and may back any number of
+    Attachment rows. Blobs no row refers to are removed by collect_garbage.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.tmp_dir = os.path.join(directory, "tmp")
+        self.lock_path = os.path.join(directory, ".lock")
+
+    @contextmanager
+    def _locked(self, operation: int):
+        """
+        Hold the store's file lock, shared by every worker process. Storing
+        takes it shared, removing exclusive, so a blob cannot be removed
+        between a duplicate upload finding it and bumping its mtime.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f, operation)
+            yield
+
+    def path(self, content_hash: str) -> str:
+        return os.path.join(
+            self.directory, content_hash[:2], content_hash[2:4], content_hash
+        )
+
+    async def save(self, file: UploadFile) -> tuple[str, int, str]:
+        """Store an upload. Returns its content hash, size and blob path."""
+        await run_in_threadpool(os.makedirs, self.tmp_dir, exist_ok=True)
+        tmp_path = os.path.join(self.tmp_dir, uuid.uuid4().hex)
+        content_hash, size = await stream_upload(file, tmp_path)
+        path = self.path(content_hash)
+        await run_in_threadpool(self._commit, tmp_path, path)
+        return content_hash, size, path
+
+    def _commit(self, tmp_path: str, path: str):
+        with self._locked(fcntl.LOCK_SH):
+            self._commit_locked(tmp_path, path)
+
+    def _commit_locked(self, tmp_path: str, path: str):
+        if os.path.exists(path):
+            # Already stored. Bump the mtime so the garbage collector's grace
+            # period covers the row about to be written for it
+            os.remove(tmp_path)
+            os.utime(path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    def stale_blobs(self, grace: float) -> list[str]:
+        """
+        Hashes of blobs untouched for `grace` seconds. Temp files that old are
+        left over from interrupted uploads and are removed.
+        """
+        cutoff = time.time() - grace
+        hashes = []
+        if not os.path.isdir(self.directory):
+            return hashes
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) >= cutoff:
+                        continue
+                except FileNotFoundError:
+                    continue
+                if root == self.tmp_dir:
+                    # Interrupted upload
+                    os.remove(path)
+                elif "." not in name:
+                    # Files derived from a blob (<hash>.<suffix>) go with it
+                    hashes.append(name)
+        return hashes
+
+    def remove(self, content_hashes: list[str], grace: float):
+        """
+        Remove blobs and their derived files, skipping any touched in the last
+        `grace` seconds, i.e. since stale_blobs listed them.
+        """
+        cutoff = time.time() - grace
+        for content_hash in content_hashes:
+            path = self.path(content_hash)
+            with self._locked(fcntl.LOCK_EX):
+                try:
+                    if os.path.getmtime(path) >= cutoff:
+                        # Uploaded again; its new row may not be committed yet
+                        continue
+                except FileNotFoundError:
+                    continue
+                for derived in glob.glob(f"{glob.escape(path)}.*"):
+                    os.remove(derived)
+                os.remove(path)
+            logger.info(f"Removed orphaned blob {content_hash}")
+
+
+blob_store = BlobStore(STORAGE_DIR)
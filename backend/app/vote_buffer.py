@@ -0,0 +1,185 @@
+import os
+import time
+from collections import defaultdict
+
+from sqlalchemy import Integer, column, tuple_, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Comment, Thread, Vote
+
+# With a positive VOTE_FLUSH_INTERVAL, votes are buffered in memory and written
+# every that many seconds instead of on each request. Votes stop being accepted
+# once the oldest unwritten one is VOTE_MAX_STALENESS seconds old, e.g. because
+# the database is down
+VOTE_FLUSH_INTERVAL = float(os.getenv("VOTE_FLUSH_INTERVAL", "0"))
+VOTE_MAX_STALENESS = float(os.getenv("VOTE_MAX_STALENESS", "30"))
+# Votes written per transaction
+VOTE_FLUSH_BATCH_SIZE = 1000
+
+# Vote foreign key column -> model holding that target's counters
+TARGETS = {"thread_id": Thread, "comment_id": Comment}
+
+# A pending vote is a map from the stored vote before the flush (-1, 0 or 1)
+# to the vote after it, as a tuple indexed by old value + 1
+VoteMap = tuple[int, int, int]
+VoteKey = tuple[int, str, int]  # (user_id, "thread_id" | "comment_id", target id)
+
+
+def toggle(value: int) -> VoteMap:
+    """Voting `value`: removes an identical vote, otherwise sets it."""
+    return tuple(0 if old == value else value for old in (-1, 0, 1))
+
+
+def compose(later: VoteMap, earlier: VoteMap) -> VoteMap:
+    return tuple(later[new + 1] for new in earlier)
+
+
+class VoteBuffer:
+    """
+    Votes waiting to be written, coalesced per user and target so that any
+    number of clicks costs one row write and one counter update per flush.
+    """
+
+    def __init__(self):
+        self._pending: dict[VoteKey, VoteMap] = {}
+        self._since: float | None = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, user_id: int, column_name: str, target_id: int, value: int):
+        key = (user_id, column_name, target_id)
+        earlier = self._pending.get(key)
+        self._pending[key] = (
+            toggle(value) if earlier is None else compose(toggle(value), earlier)
+        )
+        if self._since is None:
+            self._since = time.monotonic()
+
+    def staleness(self) -> float:
+        """Seconds the oldest pending vote has been waiting."""
+        return 0.0 if self._since is None else time.monotonic() - self._since
+
+    def take(self) -> tuple[dict[VoteKey, VoteMap], float | None]:
+        pending, since = self._pending, self._since
+        self._pending, self._since = {}, None
+        return pending, since
+
+    def restore(self, pending: dict[VoteKey, VoteMap], since: float | None):
+        """Put back votes that failed to flush, ahead of any added since."""
+        for key, earlier in pending.items():
+            later = self._pending.get(key)
+            self._pending[key] = earlier if later is None else compose(later, earlier)
+        if since is not None and (self._since is None or since < self._since):
+            self._since = since
+
+
+async def apply_buffered_votes(session: AsyncSession, pending: dict[VoteKey, VoteMap]):
+    """
+    Write a batch of coalesced votes and adjust the counters by the net
+    change, in the caller's transaction. Votes on deleted targets are dropped.
+    """
+    # Lock targets in id order, so concurrent flushes from other workers
+    # cannot deadlock, and find which still exist
+    live = set()
+    for column_name, model in TARGETS.items():
+        ids = sorted({t for _, c, t in pending if c == column_name})
+        if ids:
+            found = await session.exec(
+                select(model.id)
+                .where(model.id.in_(ids))
+                .order_by(model.id)
+                .with_for_update()
+            )
+            live.update((column_name, id) for id in found.all())
+    pending = {key: m for key, m in pending.items() if (key[1], key[2]) in live}
+
+    stored: dict[VoteKey, Vote] = {}
+    for column_name in TARGETS:
+        target = getattr(Vote, column_name)
+        pairs = [(u, t) for u, c, t in pending if c == column_name]
+        if pairs:
+            for vote in (
+                await session.exec(
+                    select(Vote)
+                    .where(tuple_(Vote.user_id, target).in_(pairs))
+                    .order_by(Vote.id)
+                    .with_for_update()
+                )
+            ).all():
+                stored[(vote.user_id, column_name, getattr(vote, column_name))] = vote
+
+    removed, flipped, added = [], defaultdict(list), []
+    changes: dict[VoteKey, tuple[int, int]] = {}
+    for key, vote_map in pending.items():
+        vote = stored.get(key)
+        old = vote.value if vote else 0
+        new = vote_map[old + 1]
+        if new == old:
+            continue
+        changes[key] = (old, new)
+        if new == 0:
+            removed.append(vote.id)
+        elif old != 0:
+            flipped[new].append(vote.id)
+        else:
+            added.append(key)
+
+    if removed:
+        await session.exec(delete(Vote).where(Vote.id.in_(removed)))
+    for value, ids in flipped.items():
+        await session.exec(update(Vote).where(Vote.id.in_(ids)).values(value=value))
+    for column_name in TARGETS:
+        rows = [
+            {"user_id": u, column_name: t, "value": changes[(u, c, t)][1]}
+            for u, c, t in added
+            if c == column_name
+        ]
+        if not rows:
+            continue
+        target = getattr(Vote, column_name)
+        # A vote written meanwhile by another worker wins; skip ours
+        inserted = set(
+            (
+                await session.exec(
+                    insert(Vote)
+                    .values(rows)
+                    .on_conflict_do_nothing(
+                        index_elements=["user_id", column_name],
+                        index_where=target.isnot(None),
+                    )
+                    .returning(Vote.user_id, target)
+                )
+            ).all()
+        )
+        for u, t in {(row["user_id"], row[column_name]) for row in rows} - inserted:
+            del changes[(u, column_name, t)]
+
+    deltas: dict[tuple[str, int], list[int]] = defaultdict(lambda: [0, 0, 0])
+    for (_, column_name, target_id), (old, new) in changes.items():
+        delta = deltas[(column_name, target_id)]
+        delta[0] += new - old
+        delta[1] += (new == 1) - (old == 1)
+        delta[2] += (new == -1) - (old == -1)
+    for column_name, model in TARGETS.items():
+        rows = [(t, *delta) for (c, t), delta in deltas.items() if c == column_name]
+        if not rows:
+            continue
+        delta = values(
+            column("id", Integer),
+            column("score", Integer),
+            column("upvotes", Integer),
+            column("downvotes", Integer),
+            name="delta",
+        ).data(rows)
+        await session.exec(
+            update(model)
+            .where(model.id == delta.c.id)
+            .values(
+                score=model.score + delta.c.score,
+                upvotes=model.upvotes + delta.c.upvotes,
+                downvotes=model.downvotes + delta.c.downvotes,
+            )
+        )
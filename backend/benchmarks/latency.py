@@ -0,0 +1,20 @@
+"""Latency summaries shared by the load test scripts."""
+
+import statistics
+
+
+def percentile(samples: list[float], p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+
+def report(name: str, samples: list[float], width: int = 8):
+    if not samples:
+        print(f"{name:>{width}}: no samples")
+        return
+    print(
+        f"{name:>{width}}: n={len(samples)} "
+        f"mean={statistics.mean(samples) * 1000:.1f}ms "
+        f"p50={percentile(samples, 50) * 1000:.1f}ms "
+        f"p99={percentile(samples, 99) * 1000:.1f}ms"
+    )
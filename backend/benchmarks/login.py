@@ -0,0 +1,75 @@
+"""
+Concurrent-login load test.
+
+Fires REQUESTS logins with CONCURRENCY in flight against a running server
+and reports latency percentiles, plus how many requests were shed with 503.
+Meanwhile it polls GET / to show whether other routes stay responsive.
+
+    fastapi run app/main.py
+    python benchmarks/login.py --requests 500 --concurrency 100
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+from latency import report
+
+
+async def main(base_url: str, requests: int, concurrency: int):
+    username = f"bench-{uuid.uuid4().hex[:8]}"
+    password = "bench-password"
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        response = await client.post(
+            "/signup", json={"username": username, "password": password}
+        )
+        response.raise_for_status()
+
+        semaphore = asyncio.Semaphore(concurrency)
+        login_times, statuses = [], {}
+
+        async def login():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/login", data={"username": username, "password": password}
+                )
+                statuses[response.status_code] = (
+                    statuses.get(response.status_code, 0) + 1
+                )
+                if response.status_code == 200:
+                    login_times.append(time.perf_counter() - start)
+
+        ping_times = []
+        done = asyncio.Event()
+
+        async def ping():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/")
+                ping_times.append(time.perf_counter() - start)
+                await asyncio.sleep(0.05)
+
+        pinger = asyncio.create_task(ping())
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(requests)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await pinger
+
+    print(f"{requests} logins in {elapsed:.2f}s ({requests / elapsed:.1f}/s)")
+    print(f"status codes: {statuses}")
+    report("login", login_times)
+    report("GET /", ping_times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000/api")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url, args.requests, args.concurrency))
@@ -0,0 +1,195 @@
+"""
+Query plan check for the hot read paths.
+
+Optionally seeds the database with SEED synthetic threads and their comments,
+replies, votes and attachments. Otherwise calls each hot route in-process,
+runs EXPLAIN on every SELECT it issues and exits non-zero if any of them
+sequentially scans one of the large tables.
+
+    alembic upgrade head
+    python benchmarks/query_plans.py --seed 200000
+    python benchmarks/query_plans.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+from sqlalchemy import event, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.main import app, engine, get_optional_user  # noqa: E402
+from app.models import User  # noqa: E402
+
+# Tables that grow with usage; small lookup tables may be scanned
+HOT_TABLES = {"thread", "comment", "vote", "attachment"}
+CATEGORIES = ["hardware", "software", "airframe", "payload", "power"]
+TAGS = 50
+
+
+async def seed(count: int):
+    start = time.perf_counter()
+    async with engine.begin() as conn:
+        user_id = (
+            await conn.execute(
+                text(
+                    'INSERT INTO "user" (username, password_hash, role, created_at) '
+                    "VALUES ('plan-bench-' || md5(random()::text), '', 'user', now()) "
+                    "RETURNING id"
+                )
+            )
+        ).scalar_one()
+        categories = "ARRAY[" + ",".join(f"'{c}'" for c in CATEGORIES) + "]"
+        await conn.execute(
+            text(
+                "INSERT INTO thread (user_id, title, content, summary, category, tags, "
+                "created_at, updated_at, score, upvotes, downvotes) "
+                "SELECT :user_id, 'thread ' || g, 'body', 'summary', "
+                f"({categories})[1 + g % {len(CATEGORIES)}], "
+                f"jsonb_build_array('tag' || g % {TAGS}, 'tag' || g % 7), "
+                "now() - g * interval '1 second', now(), 0, 0, 0 "
+                "FROM generate_series(1, :count) AS g"
+            ),
+            {"user_id": user_id, "count": count},
+        )
+        # Five top-level comments per new thread, then two levels of replies
+        await conn.execute(
+            text(
+                "INSERT INTO comment (thread_id, user_id, content, created_at, "
+                "score, upvotes, downvotes) "
+                "SELECT t.id, :user_id, 'comment', now() - g * interval '1 second', "
+                "0, 0, 0 FROM thread AS t, generate_series(1, 5) AS g "
+                "WHERE t.user_id = :user_id"
+            ),
+            {"user_id": user_id},
+        )
+        for _ in range(2):
+            await conn.execute(
+                text(
+                    "INSERT INTO comment (thread_id, user_id, content, "
+                    "parent_comment_id, created_at, score, upvotes, downvotes) "
+                    "SELECT c.thread_id, :user_id, 'reply', c.id, now(), 0, 0, 0 "
+                    "FROM comment AS c WHERE c.user_id = :user_id "
+                    "AND NOT EXISTS (SELECT 1 FROM comment AS r "
+                    "WHERE r.parent_comment_id = c.id) AND c.id % 2 = 0"
+                ),
+                {"user_id": user_id},
+            )
+        for fk, table in (("thread_id", "thread"), ("comment_id", "comment")):
+            await conn.execute(
+                text(
+                    f"INSERT INTO vote (user_id, {fk}, value) "
+                    f"SELECT :user_id, id, 1 FROM {table} "
+                    "WHERE user_id = :user_id AND id % 10 = 0"
+                ),
+                {"user_id": user_id},
+            )
+        await conn.execute(
+            text(
+                "INSERT INTO attachment (thread_id, file_url, file_type) "
+                "SELECT id, '/tmp/plan-bench-' || id || '.stl', 'stl' "
+                "FROM thread WHERE user_id = :user_id AND id % 10 = 0"
+            ),
+            {"user_id": user_id},
+        )
+        for table in ("thread", "comment", "vote", "attachment"):
+            await conn.execute(text(f"ANALYZE {table}"))
+    print(f"seeded {count} threads in {time.perf_counter() - start:.1f}s")
+
+
+def seq_scans(plan: dict) -> list[str]:
+    """Hot tables read by a Seq Scan anywhere in the plan tree."""
+    found = []
+    if plan.get("Node Type") == "Seq Scan" and plan.get("Relation Name") in HOT_TABLES:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+async def explain(statement: str, parameters) -> dict:
+    async with engine.connect() as conn:
+        result = await conn.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {statement}", parameters
+        )
+        plan = result.scalar_one()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+async def main() -> int:
+    async with engine.connect() as conn:
+        row = (
+            await conn.execute(
+                text(
+                    "SELECT t.id, t.user_id, a.file_url FROM thread AS t "
+                    "JOIN attachment AS a ON a.thread_id = t.id "
+                    "ORDER BY t.id DESC LIMIT 1"
+                )
+            )
+        ).first()
+    if row is None:
+        print("no data; run with --seed first")
+        return 1
+    thread_id, user_id, file_url = row
+
+    # Signed-in requests also load the viewer's votes
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        viewer = await session.get(User, user_id)
+    app.dependency_overrides[get_optional_user] = lambda: viewer
+
+    routes = {
+        "feed": "/threads",
+        "feed by category": f"/threads?category={CATEGORIES[0]}",
+        "feed by tag": "/threads?tag=tag1",
+        "thread": f"/threads/{thread_id}",
+        "comments": f"/comments/{thread_id}",
+        "comment tree": f"/threads/{thread_id}/comment-tree",
+        "file": f"/file/{os.path.basename(file_url)}",
+    }
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append((statement, parameters))
+
+    failures = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        for name, path in routes.items():
+            captured.clear()
+            event.listen(engine.sync_engine, "before_cursor_execute", capture)
+            try:
+                await client.get(path)
+            finally:
+                event.remove(engine.sync_engine, "before_cursor_execute", capture)
+            for statement, parameters in captured:
+                scans = seq_scans(await explain(statement, parameters))
+                status = "FAIL" if scans else "ok"
+                failures += bool(scans)
+                summary = " ".join(statement.split())[:100]
+                print(f"{status:>4} {name}: {summary}")
+                if scans:
+                    print(f"     seq scan on {', '.join(sorted(set(scans)))}")
+    app.dependency_overrides.clear()
+    await engine.dispose()
+    print(f"{failures} queries with sequential scans")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed", type=int, help="insert this many threads and exit")
+    args = parser.parse_args()
+    if args.seed:
+        asyncio.run(seed(args.seed))
+    else:
+        sys.exit(asyncio.run(main()))
@@ -0,0 +1,109 @@
+"""
+Micro-benchmark for analyze_glb.
+
+Renders every viewpoint of a set of sample meshes and reports load/setup
+time and per-view render time. Pass model files to benchmark your own
+meshes; by default icospheres of increasing density are generated.
+
+    PYOPENGL_PLATFORM=egl python benchmarks/render.py
+    PYOPENGL_PLATFORM=egl python benchmarks/render.py model.stl drone.glb
+
+With --lod, LODs are built first (as after an upload) and the LOD the
+renderer would pick is timed instead of the original.
+
+With --pipeline, the full render_model pipeline runs instead, against the
+offline stub image provider, to time the uploads and generation call.
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import trimesh
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.image_providers import StubProvider  # noqa: E402
+from app.mesh import build_lods, load_mesh, select_lod  # noqa: E402
+from app.rendering import IMAGE_MODEL, RENDER_SIZE, analyze_glb, render_model  # noqa: E402
+
+
+def sample_meshes(directory: str) -> list[str]:
+    paths = []
+    for subdivisions in (3, 5, 7):
+        path = os.path.join(directory, f"icosphere-{subdivisions}.stl")
+        trimesh.creation.icosphere(subdivisions=subdivisions).export(path)
+        paths.append(path)
+    return paths
+
+
+def run_pipeline(paths: list[str], repeat: int, latency: float):
+    print(f"stub latency {latency * 1000:.0f}ms per call")
+    print(f"{'mesh':<28}{'faces':>10}{'total':>10}")
+    for path in paths:
+        faces = len(trimesh.load_mesh(path).faces)
+        file_type = path.rsplit(".", 1)[-1]
+        totals = []
+        for _ in range(repeat):
+            provider = StubProvider(IMAGE_MODEL, latency=latency)
+            start = time.perf_counter()
+            render_model(path, file_type, provider)
+            totals.append(time.perf_counter() - start)
+        total = statistics.median(totals)
+        print(f"{os.path.basename(path):<28}{faces:>10}{total * 1000:>8.0f}ms")
+
+
+def main(paths: list[str], repeat: int, pipeline: bool, latency: float, lod: bool):
+    with tempfile.TemporaryDirectory() as directory:
+        paths = paths or sample_meshes(directory)
+        if pipeline:
+            run_pipeline(paths, repeat, latency)
+            return
+        print(f"{'mesh':<28}{'faces':>10}{'total':>10}{'setup':>10}{'per view':>10}")
+        for path in paths:
+            file_type = path.rsplit(".", 1)[-1]
+            if lod:
+                # Build next to a copy so no LODs are left beside user files
+                copy = shutil.copy(
+                    path, os.path.join(directory, f"lod-{os.path.basename(path)}")
+                )
+                build_lods(load_mesh(copy, file_type), copy)
+                path, file_type = select_lod(copy, file_type, RENDER_SIZE)
+            faces = len(load_mesh(path, file_type).faces)
+            totals, view_times = [], []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                metadata = analyze_glb(path, file_type)
+                totals.append(time.perf_counter() - start)
+                if "error" in metadata:
+                    sys.exit(f"{path}: {metadata['error']}")
+                view_times.extend(metadata["render_times"].values())
+
+            total = statistics.median(totals)
+            per_view = statistics.median(view_times)
+            setup = total - sum(view_times) / repeat
+            print(
+                f"{os.path.basename(path):<28}{faces:>10}"
+                f"{total * 1000:>8.0f}ms{setup * 1000:>8.0f}ms{per_view * 1000:>8.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="*", help="STL/GLB files to render")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--pipeline", action="store_true", help="time render_model with a stub"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="stub seconds per call"
+    )
+    parser.add_argument(
+        "--lod", action="store_true", help="render the LOD the renderer picks"
+    )
+    args = parser.parse_args()
+    main(args.paths, args.repeat, args.pipeline, args.latency, args.lod)
@@ -0,0 +1,119 @@
+"""
+Full-text search latency test.
+
+Optionally seeds the database with SEED synthetic threads, then issues
+QUERIES searches with CONCURRENCY in flight against a running server and
+reports latency percentiles for the first page and for a follow-up page.
+
+    python benchmarks/search.py --seed 1000000
+    fastapi run app/main.py
+    python benchmarks/search.py --queries 200 --concurrency 10
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+import httpx
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.main import DATABASE_URL  # noqa: E402
+from latency import report  # noqa: E402
+
+VOCABULARY = (
+    "drone frame carbon rotor motor battery lidar sensor gimbal propeller "
+    "chassis mount bracket hinge enclosure antenna payload wing fuselage "
+    "servo actuator gearbox bearing shaft coupler nozzle heatsink fan duct "
+    "printed aluminum titanium nylon resin mesh bracket clamp rail landing "
+    "gear tail boom camera thermal radar sonar tether winch parachute"
+).split()
+QUERIES = [
+    "drone",
+    "carbon frame",
+    '"landing gear"',
+    "lidar OR radar",
+    "gimbal -camera",
+    "titanium bracket",
+    "parachute",
+    "thermal camera mount",
+]
+
+
+async def seed(count: int):
+    engine = create_async_engine(DATABASE_URL)
+    words = "ARRAY[" + ",".join(f"'{w}'" for w in VOCABULARY) + "]"
+    random_text = (
+        f"(SELECT string_agg(({words})[1 + floor(random() * {len(VOCABULARY)})::int], ' ') "
+        "FROM generate_series(1, {n}) WHERE g > 0)"
+    )
+    async with engine.begin() as conn:
+        user_id = (
+            await conn.execute(
+                text(
+                    'INSERT INTO "user" (username, password_hash, role, created_at) '
+                    "VALUES ('search-bench-' || md5(random()::text), '', 'user', now()) "
+                    "RETURNING id"
+                )
+            )
+        ).scalar_one()
+        start = time.perf_counter()
+        await conn.execute(
+            text(
+                "INSERT INTO thread (user_id, title, content, summary, created_at, "
+                "updated_at, score, upvotes, downvotes) "
+                f"SELECT :user_id, {random_text.format(n=6)}, "
+                f"{random_text.format(n=80)}, {random_text.format(n=20)}, "
+                "now() - g * interval '1 second', now(), 0, 0, 0 "
+                "FROM generate_series(1, :count) AS g"
+            ),
+            {"user_id": user_id, "count": count},
+        )
+        await conn.execute(text("ANALYZE thread"))
+    await engine.dispose()
+    print(f"seeded {count} threads in {time.perf_counter() - start:.1f}s")
+
+
+async def main(base_url: str, queries: int, concurrency: int):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        semaphore = asyncio.Semaphore(concurrency)
+        first_page, next_page = [], []
+
+        async def search():
+            q = random.choice(QUERIES)
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get("/search", params={"q": q})
+                response.raise_for_status()
+                first_page.append(time.perf_counter() - start)
+                cursor = response.json()["next_cursor"]
+                if cursor:
+                    start = time.perf_counter()
+                    response = await client.get(
+                        "/search", params={"q": q, "cursor": cursor}
+                    )
+                    response.raise_for_status()
+                    next_page.append(time.perf_counter() - start)
+
+        await asyncio.gather(*(search() for _ in range(queries)))
+
+    report("page 1", first_page, width=10)
+    report("page 2", next_page, width=10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000/api")
+    parser.add_argument("--seed", type=int, help="insert this many threads and exit")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    if args.seed:
+        asyncio.run(seed(args.seed))
+    else:
+        asyncio.run(main(args.base_url, args.queries, args.concurrency))
@@ -0,0 +1,80 @@
+"""
+Hot-thread voting load test.
+
+Signs up USERS users, then fires VOTES votes with CONCURRENCY in flight, all
+on one new thread, and reports throughput and latency percentiles. Run it
+once with write-behind off and once with VOTE_FLUSH_INTERVAL set to compare.
+
+    fastapi run app/main.py
+    python benchmarks/votes.py --votes 5000 --concurrency 200
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import httpx
+
+from latency import report
+
+
+async def signup(client: httpx.AsyncClient) -> str:
+    response = await client.post(
+        "/signup",
+        json={"username": f"vote-bench-{uuid.uuid4().hex[:8]}", "password": "bench"},
+    )
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def main(base_url: str, users: int, votes: int, concurrency: int):
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        tokens = await asyncio.gather(*(signup(client) for _ in range(users)))
+        response = await client.post(
+            "/thread",
+            json={"title": "Vote benchmark", "content": ""},
+            headers={"Authorization": f"Bearer {tokens[0]}"},
+        )
+        response.raise_for_status()
+        thread_id = response.json()["id"]
+
+        semaphore = asyncio.Semaphore(concurrency)
+        vote_times, statuses = [], {}
+
+        async def vote():
+            token = random.choice(tokens)
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.put(
+                    "/vote",
+                    json={
+                        "thread_id": thread_id,
+                        "vote_type": random.choice(["upvote", "downvote"]),
+                    },
+                    headers={"Authorization": f"Bearer {token}"},
+                )
+                statuses[response.status_code] = (
+                    statuses.get(response.status_code, 0) + 1
+                )
+                if response.is_success:
+                    vote_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(vote() for _ in range(votes)))
+        elapsed = time.perf_counter() - start
+
+    print(f"{votes} votes in {elapsed:.2f}s ({votes / elapsed:.1f}/s)")
+    print(f"status codes: {statuses}")
+    report("vote", vote_times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000/api")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--votes", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url, args.users, args.votes, args.concurrency))
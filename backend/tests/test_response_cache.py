@@ -0,0 +1,52 @@
+import unittest
+
+from app.response_cache import CachedResponse, LRUBackend, ResponseCache
+
+PAGE = CachedResponse(b"{}", '"etag"')
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = ResponseCache(LRUBackend(maxsize=100, ttl=60))
+
+    def test_unrelated_invalidation_keeps_concurrent_rebuilds(self):
+        generation = self.cache.generation
+        # A write to thread A lands while other pages are being rebuilt
+        self.cache.invalidate("thread:A")
+        self.cache.set("/threads/B", PAGE, ["thread:B"], generation)
+        self.cache.set(
+            "/threads?category=hardware",
+            PAGE,
+            ["thread:B", "thread:C", "category:hardware"],
+            generation,
+        )
+        self.assertEqual(self.cache.get("/threads/B"), PAGE)
+        self.assertEqual(self.cache.get("/threads?category=hardware"), PAGE)
+
+    def test_invalidated_tag_discards_concurrent_rebuild(self):
+        generation = self.cache.generation
+        self.cache.invalidate("thread:A")
+        self.cache.set("/threads/A", PAGE, ["thread:A"], generation)
+        self.cache.set("/threads", PAGE, ["thread:A", "thread:B"], generation)
+        self.assertIsNone(self.cache.get("/threads/A"))
+        self.assertIsNone(self.cache.get("/threads"))
+
+    def test_rebuild_after_invalidation_is_stored(self):
+        self.cache.invalidate("thread:A")
+        self.cache.set("/threads/A", PAGE, ["thread:A"], self.cache.generation)
+        self.assertEqual(self.cache.get("/threads/A"), PAGE)
+
+    def test_forgotten_invalidations_discard_older_rebuilds(self):
+        cache = ResponseCache(LRUBackend(maxsize=100, ttl=60), history=2)
+        generation = cache.generation
+        for tag in ("thread:A", "thread:B", "thread:C"):
+            cache.invalidate(tag)
+        # thread:A's invalidation is no longer recorded, so it cannot be ruled out
+        cache.set("/threads/A", PAGE, ["thread:A"], generation)
+        self.assertIsNone(cache.get("/threads/A"))
+        cache.set("/threads/A", PAGE, ["thread:A"], cache.generation)
+        self.assertEqual(cache.get("/threads/A"), PAGE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -24,13 +24,14 @@ export interface IComment {
   user: IUser;
   thread_id: number;
   parent_comment_id?: string;
+  score: number;
   vote: IVote[];
 }
 
 export default function Comment({ comment }: { comment: IComment }) {
   const queryClient = useQueryClient();
   const { user } = useAuth();
-  const voteCount = comment.vote.reduce((acc, v) => acc + v.value, 0);
+  const voteCount = comment.score;
 
   const voteMut = useMutation({
     mutationFn: ({
@@ -13,10 +13,21 @@ import {
 import { TooltipContent, TooltipTrigger } from "./ui/tooltip";
 import { Tooltip } from "@radix-ui/react-tooltip";
 
+interface IRenderJob {
+  id: number;
+  status: "queued" | "running" | "done" | "failed";
+  error: string | null;
+  result_url: string | null;
+}
+
 export function FilePreview({ attachment }: { attachment: IAttachment }) {
   const [imageUrl, setImageUrl] = useState<string | null>(null);
   const [open, setOpen] = useState(false);
-  const filename = attachment.file_url.split("/").pop() || "file";
+  // Stored blobs are named by content hash, without an extension
+  const basename = attachment.file_url.split("/").pop() || "file";
+  const filename = basename.includes(".")
+    ? basename
+    : `${basename}.${attachment.file_type}`;
 
   const download = useMutation({
     mutationFn: async () => {
@@ -37,14 +48,16 @@ export function FilePreview({ attachment }: { attachment: IAttachment }) {
 
   const renderMut = useMutation({
     mutationFn: async () => {
-      const res = await apiClient.post(
-        `/render/${attachment.id}`,
-        {},
-        {
-          timeout: 120000,
-          responseType: "blob",
-        }
-      );
+      let job = (await apiClient.post<IRenderJob>(`/render/${attachment.id}`))
+        .data;
+      while (job.status === "queued" || job.status === "running") {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        job = (await apiClient.get<IRenderJob>(`/render/jobs/${job.id}`)).data;
+      }
+      if (job.status !== "done" || !job.result_url) {
+        throw new Error(job.error || "Render failed");
+      }
+      const res = await apiClient.get(job.result_url, { responseType: "blob" });
       return res.data;
     },
     onSuccess: (blob: Blob) => {
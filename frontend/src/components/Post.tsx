@@ -1,7 +1,7 @@
 import { useMutation, useQueryClient } from "@tanstack/react-query";
 import { useNavigate } from "@tanstack/react-router";
 import { ArrowDown, ArrowUp, Trash } from "lucide-react";
-import { apiClient } from "../lib/client";
+import { BASE_URL, apiClient } from "../lib/client";
 import { useAuth } from "../AuthProvider";
 import { FilePreview } from "./FilePreview";
 import { toast } from "sonner";
@@ -19,6 +19,7 @@ export interface IAttachment {
   id: number;
   file_url: string;
   file_type: string;
+  thumbnail_url: string | null;
 }
 export interface IPost {
   id: number;
@@ -30,15 +31,23 @@ export interface IPost {
   category: string;
   tags: string[];
   summary: string;
+  score: number;
   vote: IVote[];
   attachment: IAttachment;
 }
 
-export default function Post({ thread }: { thread: IPost }) {
+export default function Post({
+  thread,
+  compact = false,
+}: {
+  thread: IPost;
+  // Show the attachment's thumbnail instead of loading the full model
+  compact?: boolean;
+}) {
   const navigate = useNavigate();
   const queryClient = useQueryClient();
   const { user } = useAuth();
-  const voteCount = thread.vote?.reduce((acc, v) => acc + v.value, 0);
+  const voteCount = thread.score;
 
   const mutation = useMutation({
     mutationFn: ({
@@ -188,9 +197,16 @@ export default function Post({ thread }: { thread: IPost }) {
               <Markdown remarkPlugins={[remarkGfm]}>{thread.content}</Markdown>
             </div>
             <div>
-              {thread.attachment && (
-                <FilePreview attachment={thread.attachment} />
-              )}
+              {thread.attachment &&
+                (compact && thread.attachment.thumbnail_url ? (
+                  <img
+                    className="ml-2 h-[256px] w-[256px]"
+                    src={`${BASE_URL}${thread.attachment.thumbnail_url}`}
+                    alt="Attachment preview"
+                  />
+                ) : (
+                  <FilePreview attachment={thread.attachment} />
+                ))}
             </div>
           </div>
         </div>
@@ -3,6 +3,11 @@ import { toast } from "sonner";
 
 export const BASE_URL = import.meta.env.VITE_API_BASE_URL || "http://localhost:8000/api"
 
+export interface IPage<T> {
+    items: T[];
+    next_cursor: string | null;
+}
+
 export const apiClient = axios.create({
     baseURL: BASE_URL,
     timeout: 10000,
@@ -1,7 +1,7 @@
 import { createFileRoute } from "@tanstack/react-router";
 import Comment, { type IComment } from "../components/Comment";
 import { useQuery } from "@tanstack/react-query";
-import { apiClient } from "../lib/client";
+import { apiClient, type IPage } from "../lib/client";
 import Post, { type IPost } from "../components/Post";
 
 export const Route = createFileRoute("/comments/me")({
@@ -12,16 +12,20 @@ function RouteComponent() {
   const comments = useQuery<IComment[]>({
     queryKey: ["comments"],
     queryFn: async (): Promise<IComment[]> => {
-      const response = await apiClient.get("/comments");
-      return response.data;
+      const response = await apiClient.get<IPage<IComment>>("/comments", {
+        params: { limit: 100 },
+      });
+      return response.data.items;
     },
   });
 
   const posts = useQuery<IPost[]>({
     queryKey: ["threads"],
     queryFn: async (): Promise<IPost[]> => {
-      const response = await apiClient.get<IPost[]>("/threads");
-      return response.data;
+      const response = await apiClient.get<IPage<IPost>>("/threads", {
+        params: { limit: 100 },
+      });
+      return response.data.items;
     },
   });
 
@@ -5,7 +5,7 @@ import { useAuth } from "../AuthProvider";
 import Comment, { type IComment } from "../components/Comment";
 import type { IPost } from "../components/Post";
 import Post from "../components/Post";
-import { apiClient } from "../lib/client";
+import { apiClient, type IPage } from "../lib/client";
 
 export const Route = createFileRoute("/posts/$postId")({
   component: RouteComponent,
@@ -21,8 +21,11 @@ function RouteComponent() {
   const comments = useQuery<IComment[]>({
     queryKey: ["comments" + postId],
     queryFn: async (): Promise<IComment[]> => {
-      const response = await apiClient.get<IComment[]>("/comments/" + postId);
-      return response.data;
+      const response = await apiClient.get<IPage<IComment>>(
+        "/comments/" + postId,
+        { params: { limit: 100 } }
+      );
+      return response.data.items;
     },
   });
 
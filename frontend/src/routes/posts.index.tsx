@@ -1,6 +1,6 @@
 import { createFileRoute } from "@tanstack/react-router";
 import { useInfiniteQuery, useQuery } from "@tanstack/react-query";
-import { apiClient } from "../lib/client";
+import { apiClient, type IPage } from "../lib/client";
 import type { IPost } from "../components/Post";
 import Post from "../components/Post";
 import React, { useEffect, useRef } from "react";
@@ -18,17 +18,17 @@ export function PostRouteComponent() {
     isFetching,
     isFetchingNextPage,
     status,
-  } = useInfiniteQuery<IPost[]>({
+  } = useInfiniteQuery<IPage<IPost>>({
     queryKey: ["threads"],
-    queryFn: async (page): Promise<IPost[]> => {
-      const response = await apiClient.get<IPost[]>("/threads", {
-        params: { page: page.pageParam },
+    queryFn: async (page): Promise<IPage<IPost>> => {
+      const response = await apiClient.get<IPage<IPost>>("/threads", {
+        params: { cursor: page.pageParam ?? undefined },
       });
       return response.data;
     },
-    initialPageParam: 0,
-    getNextPageParam: (lastPage, allPages) => {
-      return lastPage.length === 10 ? allPages.length : undefined;
+    initialPageParam: null,
+    getNextPageParam: (lastPage) => {
+      return lastPage.next_cursor ?? undefined;
     },
   });
 
@@ -64,10 +64,10 @@ export function PostRouteComponent() {
         </div>
       )}
       <ul className="space-y-6">
-        {data?.pages.map((threads, index) => (
+        {data?.pages.map((page, index) => (
           <React.Fragment key={index}>
-            {threads.map((thread) => (
-              <Post key={thread.id} thread={thread} />
+            {page.items.map((thread) => (
+              <Post key={thread.id} thread={thread} compact />
             ))}
           </React.Fragment>
         ))}